@@ -1,41 +1,151 @@
+// Protocolo binário (ver src/protocol.py): quadros de 9 bytes
+// 0xA5 | versão | tipo | seq | payload uint32 little-endian | CRC-8
+const byte START_BYTE = 0xA5;
+const byte VERSION = 1;
+const byte FRAME_SIZE = 9;
+
+const byte READY = 0x01;
+const byte SET_PINS = 0x02;
+const byte BAUD = 0x03;
+const byte PING = 0x04;
+const byte ACK = 0x05;
+const byte NACK = 0x06;
+
+const unsigned long INITIAL_BAUDRATE = 9600;
+const unsigned long allowedBaudrates[] = {9600, 19200, 38400, 57600, 115200};
+const int numBaudrates = sizeof(allowedBaudrates) / sizeof(allowedBaudrates[0]);
+
 const int ledPins[] = {2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13};
 const int numPins = sizeof(ledPins) / sizeof(ledPins[0]);
 
+byte frame[FRAME_SIZE];
+byte frameLength = 0;
+
 void setup()
 {
-    Serial.begin(9600);
+    Serial.begin(INITIAL_BAUDRATE);
 
     for (int i = 0; i < numPins; i++)
     {
         pinMode(ledPins[i], OUTPUT);
     }
+
+    // avisa o Python que a placa terminou de reiniciar
+    sendFrame(READY, 0, 0);
 }
 
 void loop()
 {
-    if (Serial.available())
+    // lê só o que já chegou, sem bloquear nem usar String
+    while (Serial.available())
     {
-        String command = Serial.readStringUntil('\n');
+        byte value = Serial.read();
 
-        if (command.startsWith("LED:"))
+        if (frameLength == 0 && value != START_BYTE)
         {
-            int pin = command.substring(4).toInt();
+            continue;
+        }
 
-            turnOffAllLeds();
+        frame[frameLength++] = value;
 
-            digitalWrite(pin, HIGH);
+        if (frameLength == FRAME_SIZE)
+        {
+            frameLength = 0;
+            handleFrame();
+        }
+    }
+}
 
-            // delay(2000);
+byte crc8(const byte *data, byte length)
+{
+    byte crc = 0;
+    for (byte i = 0; i < length; i++)
+    {
+        crc ^= data[i];
+        for (byte bit = 0; bit < 8; bit++)
+        {
+            crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+        }
+    }
+    return crc;
+}
+
+void sendFrame(byte type, byte seq, unsigned long payload)
+{
+    byte out[FRAME_SIZE];
+    out[0] = START_BYTE;
+    out[1] = VERSION;
+    out[2] = type;
+    out[3] = seq;
+    for (byte i = 0; i < 4; i++)
+    {
+        out[4 + i] = (payload >> (8 * i)) & 0xFF;
+    }
+    out[8] = crc8(out + 1, FRAME_SIZE - 2);
+    Serial.write(out, FRAME_SIZE);
+}
 
-            // turnOffAllLeds();
+void handleFrame()
+{
+    byte seq = frame[3];
+
+    if (crc8(frame + 1, FRAME_SIZE - 2) != frame[8] || frame[1] != VERSION)
+    {
+        sendFrame(NACK, seq, 0);
+        return;
+    }
+
+    unsigned long payload = 0;
+    for (byte i = 0; i < 4; i++)
+    {
+        payload |= (unsigned long)frame[4 + i] << (8 * i);
+    }
+
+    switch (frame[2])
+    {
+    case SET_PINS:
+        setPins(payload);
+        sendFrame(ACK, seq, payload);
+        break;
+
+    case PING:
+        sendFrame(ACK, seq, 0);
+        break;
+
+    case BAUD:
+        if (!isAllowedBaudrate(payload))
+        {
+            sendFrame(NACK, seq, 0);
+            break;
+        }
+        // confirma na velocidade atual e só então troca
+        sendFrame(ACK, seq, payload);
+        Serial.flush();
+        Serial.end();
+        Serial.begin(payload);
+        break;
+
+    default:
+        sendFrame(NACK, seq, 0);
+    }
+}
+
+bool isAllowedBaudrate(unsigned long baudrate)
+{
+    for (int i = 0; i < numBaudrates; i++)
+    {
+        if (allowedBaudrates[i] == baudrate)
+        {
+            return true;
         }
     }
+    return false;
 }
 
-void turnOffAllLeds()
+void setPins(unsigned long mask)
 {
     for (int i = 0; i < numPins; i++)
     {
-        digitalWrite(ledPins[i], LOW);
+        digitalWrite(ledPins[i], (mask >> ledPins[i]) & 1 ? HIGH : LOW);
     }
 }
@@ -1,29 +1,17 @@
 import cv2
-import numpy as np
-import tensorflow as tf
-import serial
-import time
 import sys
-import os
 import json
 import argparse
-from shared import MODEL_EXT, MODELS_FOLDER, IMG_SIZE
+from engine import DetectionPipeline
+from inference import BACKENDS, ActiveModel
+from model_watcher import ModelWatcher
+from predict import open_sources
+from registry import current_model
+from scheduler import add_scheduler_arguments, scheduler_from_args
+from serial_link import SerialLink
+from stabilizer import PredictionStabilizer
 
-
-def load_labels_from_model(model_filename):
-    label_file = model_filename.replace(MODEL_EXT, ".labels.json")
-    label_path = os.path.join(MODELS_FOLDER, label_file)
-    if not os.path.exists(label_path):
-        print(f"[ERRO] Labels '{label_file}' não encontrados.")
-        sys.exit(1)
-    with open(label_path, "r") as f:
-        return json.load(f)
-
-
-def preprocess_frame(frame):
-    frame_resized = cv2.resize(frame, (IMG_SIZE, IMG_SIZE))
-    frame_normalized = frame_resized / 255.0
-    return np.expand_dims(frame_normalized, axis=0)
+WINDOW_NAME = "Deteccao com Arduino"
 
 
 def draw_label(frame, text, position):
@@ -42,58 +30,201 @@ def draw_label(frame, text, position):
     cv2.putText(frame, text, (x, y), font, font_scale, (255, 255, 255), thickness)
 
 
-def main(model_filename, port_map, serial_port="/dev/ttyACM0"):
-    labels = load_labels_from_model(model_filename)
-    model_path = os.path.join(MODELS_FOLDER, model_filename)
-
-    model = tf.keras.models.load_model(model_path)
-    ser = serial.Serial(serial_port, 9600)
-    time.sleep(2)
-
-    cap = cv2.VideoCapture(0)
-
-    last_sent = None
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        input_data = preprocess_frame(frame)
-        prediction = model.predict(input_data, verbose=0)[0]
-
-        top_idx = prediction.argmax()
-        label = labels[top_idx]
-        confidence = prediction[top_idx]
-        port = port_map.get(label)
-
-        if port and label != last_sent:
-            print("[ARDUINO] Comando enviado:", label, "-> Porta", f"LED:{port}")
-            ser.write(f"LED:{port}\n".encode())
-            last_sent = label
+def pins_for(port):
+    # cada item pode acender um pino ou uma lista de pinos
+    if port is None or port == "":
+        return []
+    if isinstance(port, (list, tuple)):
+        return [int(p) for p in port]
+    return [int(port)]
+
+
+def validate_port_map(port_map, labels):
+    missing = [label for label in port_map if label not in labels]
+    unmapped = [label for label in labels if label not in port_map]
+    if missing:
+        print(f"[AVISO] Itens com pino configurado fora do modelo: {missing}")
+    if unmapped:
+        print(f"[AVISO] Itens do modelo sem pino configurado: {unmapped}")
+    return not missing
+
+
+def run(
+    active_model,
+    captures,
+    links,
+    port_maps,
+    stop_event=None,
+    headless=False,
+    scheduler=None,
+):
+    last_sent = [None] * len(captures)
+    stream_pins = [[] for _ in captures]
+    stabilizers = [PredictionStabilizer() for _ in captures]
+    outputs = [None] * len(captures)
+
+    def output(index, frame, result, fresh):
+        prediction, labels = result
+        # só a troca do item estável gera comando; oscilações do argmax não.
+        # Resultado reaproveitado só redesenha a última saída suavizada
+        stabilizer = stabilizers[index]
+        if fresh or outputs[index] is None:
+            outputs[index] = stabilizer.update(prediction, labels)
+        label, smoothed = outputs[index]
+        confidence = smoothed[stabilizer.current] if label else smoothed.max()
+        pins = pins_for(port_maps[index].get(label)) if label else []
+
+        if pins and label != last_sent[index]:
+            stream_pins[index] = pins
+            link = links[index]
+            # fontes que dividem a mesma placa acendem a união dos seus pinos
+            shared = sorted(
+                {
+                    pin
+                    for i, other in enumerate(links)
+                    if other is link
+                    for pin in stream_pins[i]
+                }
+            )
+            print(f"[ARDUINO] Fonte {index}: {label} -> Pinos {shared}")
+            link.send_pins(shared)
+            last_sent[index] = label
+
+        draw_label(frame, f"{label or '-'}: {confidence*100:.1f}%", (30, 60))
+        if headless:
+            return
+
+        window = stream_window_name(index, len(captures))
+        cv2.imshow(window, frame)
+
+        if cv2.getWindowProperty(window, cv2.WND_PROP_VISIBLE) < 1:
+            return False
+        if cv2.waitKey(1) & 0xFF == ord("q"):
+            return False
+
+    pipeline = DetectionPipeline(
+        captures,
+        active_model.infer_batch,
+        stop_event=stop_event,
+        drop_frames=not headless,
+        scheduler=scheduler,
+    )
+    try:
+        pipeline.run(output)
+    finally:
+        for link in set(links):
+            link.close()
+        if not headless:
+            cv2.destroyAllWindows()
+
+    if not headless:
+        for index in sorted(pipeline.failed_sources):
+            print(f"[ERRO] Não foi possível ler a fonte {index} (câmera ou vídeo).")
+    return pipeline
+
+
+def stream_window_name(index, count):
+    if count == 1:
+        return WINDOW_NAME
+    return f"{WINDOW_NAME} [{index}]"
+
+
+def open_serial(serial_port):
+    return SerialLink(serial_port)
+
+
+def per_stream(values, count, name):
+    # um valor para todas as fontes ou um por fonte
+    if len(values) == 1:
+        return list(values) * count
+    if len(values) != count:
+        raise ValueError(
+            f"Informe um {name} para todas as fontes ou um por fonte "
+            f"({count} fontes, {len(values)} valores)."
+        )
+    return list(values)
+
+
+def main(
+    model_filename,
+    port_maps,
+    serial_ports=("/dev/ttyACM0",),
+    backend="auto",
+    num_threads=None,
+    watch=True,
+    sources=("0",),
+    scheduler=None,
+):
+    try:
+        port_maps = per_stream(port_maps, len(sources), "mapa de pinos")
+        serial_ports = per_stream(serial_ports, len(sources), "porta serial")
+        active_model = ActiveModel(model_filename, backend, num_threads)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERRO] {e}")
+        sys.exit(1)
 
-        draw_label(frame, f"{label}: {confidence*100:.1f}%", (30, 60))
-        cv2.imshow("Deteccao com Arduino", frame)
+    def validate_all(labels):
+        for port_map in port_maps:
+            validate_port_map(port_map, labels)
 
-        if cv2.getWindowProperty("Deteccao com Arduino", cv2.WND_PROP_VISIBLE) < 1:
-            break
-        if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+    validate_all(active_model.get()[1])
+    watcher = ModelWatcher(active_model, current_model, on_swap=validate_all)
+    if watch:
+        watcher.start()
 
-    cap.release()
-    ser.close()
-    cv2.destroyAllWindows()
+    opened = {port: open_serial(port) for port in dict.fromkeys(serial_ports)}
+    links = [opened[port] for port in serial_ports]
+    captures = open_sources(sources)
+    try:
+        run(active_model, captures, links, port_maps, scheduler=scheduler)
+    finally:
+        watcher.stop()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", required=True)
-    parser.add_argument("--map", required=True)
-    parser.add_argument("--port", required=True)
+    parser.add_argument(
+        "--map",
+        action="append",
+        required=True,
+        help="Mapa de pinos em JSON (pode repetir, um por fonte).",
+    )
+    parser.add_argument(
+        "--port",
+        action="append",
+        required=True,
+        help="Porta serial do Arduino (pode repetir, uma por fonte).",
+    )
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument(
+        "--no-reload",
+        action="store_true",
+        help="Não troca automaticamente para modelos novos em models/.",
+    )
+    parser.add_argument(
+        "--source",
+        action="append",
+        default=None,
+        help="Índice de câmera, vídeo ou URL (pode repetir; padrão: câmera 0).",
+    )
+    add_scheduler_arguments(parser)
 
     args = parser.parse_args()
 
-    with open(args.map, "r") as f:
-        port_map = json.load(f)
-
-    main(args.model, port_map, args.port)
+    port_maps = []
+    for map_path in args.map:
+        with open(map_path, "r") as f:
+            port_maps.append(json.load(f))
+
+    main(
+        args.model,
+        port_maps,
+        args.port,
+        args.backend,
+        args.threads,
+        not args.no_reload,
+        args.source or ["0"],
+        scheduler_from_args(args),
+    )
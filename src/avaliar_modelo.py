@@ -1,64 +1,216 @@
 import os
-import glob
-import pandas as pd
-from predict import get_latest_model
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import cv2
 import numpy as np
-import json
-from shared import IMG_SIZE as SHARED_IMG_SIZE
-
-CAPTURES_DIR = "data/captures"
-MODEL_NAME = get_latest_model()
-MODEL_PATH = os.path.join("models", MODEL_NAME)
-LABELS_PATH = MODEL_PATH.replace(".keras", ".labels.json")
-
-model = load_model(MODEL_PATH)
-with open(LABELS_PATH, "r") as f:
-    labels = json.load(f)
-    idx2label = {i: label for i, label in enumerate(labels)}
-
-IMG_SIZE = (SHARED_IMG_SIZE, SHARED_IMG_SIZE)
-
-
-def predict_img(img_path):
-    img = image.load_img(img_path, target_size=IMG_SIZE)
-    x = image.img_to_array(img)
-    x = np.expand_dims(x, axis=0) / 255.0
-    pred = model.predict(x)
-    return idx2label[np.argmax(pred)]
-
-
-resultados = []
-for item in os.listdir(CAPTURES_DIR):
-    pasta = os.path.join(CAPTURES_DIR, item)
-    if not os.path.isdir(pasta):
-        continue
-    imagens = glob.glob(os.path.join(pasta, "*"))
-    total = len(imagens)
-    acertos = 0
-    for img_path in imagens:
-        pred = predict_img(img_path)
-        if pred == item:
-            acertos += 1
-    taxa = acertos / total if total > 0 else 0
-    resultados.append(
-        {"item": item, "total": total, "acertos": acertos, "taxa_acerto": taxa}
+from frames import resize_to_input
+from inference import BACKENDS, load_session
+from registry import current_model, load_labels
+from shared import CAPTURES_DIR, IMG_SIZE
+
+BATCH_SIZE = 64
+TOP_K = 3
+
+
+def list_captures():
+    samples = []
+    for item in sorted(os.listdir(CAPTURES_DIR)):
+        pasta = os.path.join(CAPTURES_DIR, item)
+        if not os.path.isdir(pasta):
+            continue
+        for file in sorted(os.listdir(pasta)):
+            samples.append((os.path.join(pasta, file), item))
+    return samples
+
+
+def load_image(path):
+    img = cv2.imread(path)
+    if img is None:
+        return None
+    return resize_to_input(img)
+
+
+def capture_batches(samples, batch_size, executor):
+    def load_batch(batch):
+        images = list(executor.map(load_image, [path for path, _ in batch]))
+        valid = [i for i, img in enumerate(images) if img is not None]
+        if not valid:
+            return np.empty((0, IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8), []
+        return np.stack([images[i] for i in valid]), [batch[i][1] for i in valid]
+
+    batches = [
+        samples[start : start + batch_size]
+        for start in range(0, len(samples), batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=1) as prefetcher:
+        pending = prefetcher.submit(load_batch, batches[0]) if batches else None
+        for i in range(len(batches)):
+            current = pending.result()
+            if i + 1 < len(batches):
+                pending = prefetcher.submit(load_batch, batches[i + 1])
+            yield current
+
+
+def shard_batches(batch_size):
+    from shards import ShardedDataset
+
+    store = ShardedDataset()
+    for start in range(0, len(store), batch_size):
+        indices = np.arange(start, min(start + batch_size, len(store)))
+        yield store.images(indices), [
+            store.labels[i] for i in store.label_indices[indices]
+        ]
+
+
+def evaluate(
+    model_filename=None,
+    source="captures",
+    batch_size=BATCH_SIZE,
+    top_k=TOP_K,
+    backend="keras",
+    workers=None,
+):
+    model_filename = model_filename or current_model()
+    if not model_filename:
+        raise FileNotFoundError("Nenhum modelo encontrado.")
+
+    labels = load_labels(model_filename)
+    label_to_index = {label: i for i, label in enumerate(labels)}
+    session = load_session(model_filename, backend)
+
+    num_classes = len(labels)
+    confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+    per_item = {}
+    top_k_hits = 0
+    total = 0
+    batch_latencies = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if source == "shards":
+            batches = shard_batches(batch_size)
+        else:
+            batches = capture_batches(list_captures(), batch_size, executor)
+
+        for images, items in batches:
+            if len(items) == 0:
+                continue
+
+            start = time.perf_counter()
+            predictions = session.predict_batch(images)
+            batch_latencies.append((time.perf_counter() - start, len(items)))
+
+            predicted = predictions.argmax(axis=1)
+            top = np.argsort(predictions, axis=1)[:, -top_k:]
+
+            for item, pred_idx, top_row in zip(items, predicted, top):
+                stats = per_item.setdefault(item, {"total": 0, "acertos": 0})
+                stats["total"] += 1
+                true_idx = label_to_index.get(item)
+                if true_idx is None:
+                    continue
+                confusion[true_idx, pred_idx] += 1
+                if pred_idx == true_idx:
+                    stats["acertos"] += 1
+                if true_idx in top_row:
+                    top_k_hits += 1
+            total += len(items)
+
+    seconds = np.array([s for s, _ in batch_latencies])
+    per_image_ms = np.array([s / n * 1000 for s, n in batch_latencies])
+    correct = sum(stats["acertos"] for stats in per_item.values())
+
+    return {
+        "model": model_filename,
+        "labels": labels,
+        "total": total,
+        "accuracy": correct / total if total > 0 else 0.0,
+        "top_k": top_k,
+        "top_k_accuracy": top_k_hits / total if total > 0 else 0.0,
+        "per_class": [
+            {
+                "item": item,
+                "total": stats["total"],
+                "acertos": stats["acertos"],
+                "taxa_acerto": stats["acertos"] / stats["total"],
+            }
+            for item, stats in sorted(per_item.items())
+        ],
+        "confusion_matrix": confusion,
+        "latency_ms": {
+            "batch_p50": float(np.percentile(seconds, 50) * 1000) if total else 0.0,
+            "batch_p95": float(np.percentile(seconds, 95) * 1000) if total else 0.0,
+            "image_p50": float(np.percentile(per_image_ms, 50)) if total else 0.0,
+            "image_p95": float(np.percentile(per_image_ms, 95)) if total else 0.0,
+            "image_p99": float(np.percentile(per_image_ms, 99)) if total else 0.0,
+        },
+    }
+
+
+def main(args):
+    import pandas as pd
+    import matplotlib.pyplot as plt
+
+    results = evaluate(
+        args.model,
+        args.source,
+        args.batch_size,
+        args.top_k,
+        args.backend,
+        args.workers,
+    )
+
+    df = pd.DataFrame(results["per_class"])
+    df.to_csv("acuracia.csv", index=False)
+    pd.DataFrame(
+        results["confusion_matrix"], index=results["labels"], columns=results["labels"]
+    ).to_csv("matriz_confusao.csv")
+
+    plt.figure(figsize=(8, 4))
+    plt.bar(df["item"], df["taxa_acerto"], color="#4a4e69")
+    plt.ylabel("Taxa de Acerto")
+    plt.xlabel("Item")
+    plt.title("Taxa de Acerto por Item")
+    plt.ylim(0, 1)
+    plt.grid(axis="y", linestyle="--", alpha=0.5)
+    plt.tight_layout()
+    plt.savefig("acuracia.png")
+    if not args.no_show:
+        plt.show()
+
+    print(df)
+    print(f"[RESULT] Modelo: {results['model']}")
+    print(f"[RESULT] Acurácia: {results['accuracy']:.2%} ({results['total']} imagens)")
+    print(
+        f"[RESULT] Acurácia top-{results['top_k']}: "
+        f"{results['top_k_accuracy']:.2%}"
+    )
+    latency = results["latency_ms"]
+    print(
+        f"[RESULT] Latência por imagem: p50 {latency['image_p50']:.2f} ms | "
+        f"p95 {latency['image_p95']:.2f} ms | p99 {latency['image_p99']:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--source", choices=["captures", "shards"], default="captures")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--backend", choices=BACKENDS, default="keras")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Threads que leem as capturas (padrão: escolha do Python).",
     )
+    parser.add_argument("--no-show", action="store_true")
+    args = parser.parse_args()
 
-df = pd.DataFrame(resultados)
-df.to_csv("acuracia.csv", index=False)
-
-import matplotlib.pyplot as plt
-
-plt.figure(figsize=(8, 4))
-plt.bar(df["item"], df["taxa_acerto"], color="#4a4e69")
-plt.ylabel("Taxa de Acerto")
-plt.xlabel("Item")
-plt.title("Taxa de Acerto por Item")
-plt.ylim(0, 1)
-plt.grid(axis="y", linestyle="--", alpha=0.5)
-plt.tight_layout()
-plt.savefig("acuracia.png")
-plt.show()
-print(df)
+    try:
+        main(args)
+    except FileNotFoundError as e:
+        print(f"[ERRO] {e}")
+        sys.exit(1)
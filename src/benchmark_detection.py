@@ -0,0 +1,229 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import resource
+import cv2
+import numpy as np
+import arduino
+import predict
+from engine import StageStats
+from inference import BACKENDS, ActiveModel
+from registry import current_model
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+class ImageDirectoryCapture:
+    """Imita cv2.VideoCapture lendo as imagens de uma pasta (ex: data/captures)."""
+
+    def __init__(self, path, loops=1):
+        self.files = sorted(
+            f
+            for f in glob.glob(os.path.join(path, "**", "*"), recursive=True)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        self.loops = loops
+        self.position = 0
+
+    def read(self):
+        while self.position < len(self.files) * self.loops:
+            path = self.files[self.position % len(self.files)]
+            self.position += 1
+            frame = cv2.imread(path)
+            if frame is not None:
+                return True, frame
+        return False, None
+
+    def release(self):
+        pass
+
+
+def open_replay_source(spec, loops=1):
+    if os.path.isdir(spec):
+        return ImageDirectoryCapture(spec, loops)
+    if not os.path.exists(spec):
+        raise FileNotFoundError(f"Fonte '{spec}' não encontrada.")
+    return cv2.VideoCapture(spec)
+
+
+class TimedModel:
+    """Separa o tempo de pré-processamento do tempo do modelo em cada lote."""
+
+    def __init__(self, active_model):
+        self.active_model = active_model
+        self.stats = {
+            "preprocess": StageStats("preprocess"),
+            "inference": StageStats("inference"),
+        }
+
+    def infer_batch(self, frames):
+        session, labels, _ = self.active_model.get()
+        start = time.perf_counter()
+        batch = session.preprocess(frames)
+        preprocessed = time.perf_counter()
+        predictions = session.predict_array(batch)
+        done = time.perf_counter()
+
+        for _ in frames:
+            self.stats["preprocess"].tick((preprocessed - start) / len(frames))
+            self.stats["inference"].tick((done - preprocessed) / len(frames))
+        return predictions, labels
+
+
+class TimedLink:
+    def __init__(self, link):
+        self.link = link
+        self.stats = StageStats("serial")
+
+    def send_pins(self, pins):
+        start = time.perf_counter()
+        self.link.send_pins(pins)
+        self.stats.tick(time.perf_counter() - start)
+
+    def close(self):
+        self.link.close()
+
+
+def summarize(latencies):
+    if len(latencies) == 0:
+        return {"count": 0}
+    ms = np.asarray(latencies) * 1000
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_benchmark(
+    model_filename,
+    sources,
+    mode="predict",
+    backend="auto",
+    num_threads=None,
+    loops=1,
+    fake_serial=False,
+    serial_port=None,
+):
+    active_model = ActiveModel(model_filename, backend, num_threads)
+    timed_model = TimedModel(active_model)
+    captures = [open_replay_source(spec, loops) for spec in sources]
+
+    device = None
+    timed_link = None
+    if mode == "arduino":
+        if fake_serial:
+            from serial_loopback import FakeArduino
+
+            device = FakeArduino().start()
+            serial_port = device.port
+        if not serial_port:
+            raise ValueError("O modo arduino precisa de --fake-serial ou --port.")
+        timed_link = TimedLink(arduino.open_serial(serial_port))
+        timed_link.link.wait_ready(timeout=10.0)
+
+    start = time.perf_counter()
+    try:
+        if mode == "arduino":
+            labels = active_model.get()[1]
+            port_map = {label: 2 + i % 12 for i, label in enumerate(labels)}
+            pipeline = arduino.run(
+                timed_model,
+                captures,
+                [timed_link] * len(captures),
+                [port_map] * len(captures),
+                headless=True,
+            )
+        else:
+            pipeline = predict.run(timed_model, captures, headless=True)
+    finally:
+        if device is not None:
+            device.stop()
+    elapsed = time.perf_counter() - start
+
+    frames = pipeline.stats["saida"].count
+    stages = {
+        "decode": summarize(pipeline.stats["captura"].latencies),
+        "preprocess": summarize(timed_model.stats["preprocess"].latencies),
+        "inference": summarize(timed_model.stats["inference"].latencies),
+        "postprocess": summarize(pipeline.stats["saida"].latencies),
+    }
+    if timed_link is not None:
+        stages["serial"] = summarize(timed_link.stats.latencies)
+        stages["serial_ack"] = summarize(list(timed_link.link.latencies))
+
+    return {
+        "model": model_filename,
+        "backend": type(active_model.get()[0]).__name__,
+        "mode": mode,
+        "sources": list(sources),
+        "frames": frames,
+        "elapsed_s": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "mean_batch": pipeline.batched_frames / max(pipeline.batches, 1),
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Replay offline do laço de detecção, sem câmera nem janela."
+    )
+    parser.add_argument(
+        "--source",
+        action="append",
+        required=True,
+        help="Vídeo ou pasta de imagens (pode repetir).",
+    )
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--mode", choices=["predict", "arduino"], default="predict")
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--loops", type=int, default=1, help="Repete as pastas.")
+    parser.add_argument(
+        "--fake-serial",
+        action="store_true",
+        help="Usa um Arduino simulado em pseudo-terminal (modo arduino).",
+    )
+    parser.add_argument("--port", default=None, help="Porta serial real (opcional).")
+    parser.add_argument("--output", default=None, help="Salva o relatório JSON.")
+    args = parser.parse_args()
+
+    model_filename = args.model or current_model()
+    if not model_filename:
+        print("[ERRO] Nenhum modelo encontrado.")
+        sys.exit(1)
+
+    try:
+        report = run_benchmark(
+            model_filename,
+            args.source,
+            args.mode,
+            args.backend,
+            args.threads,
+            args.loops,
+            args.fake_serial,
+            args.port,
+        )
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERRO] {e}")
+        sys.exit(1)
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"[INFO] Relatório salvo em: {args.output}")
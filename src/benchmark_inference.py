@@ -0,0 +1,67 @@
+import argparse
+import sys
+import time
+import numpy as np
+import tensorflow as tf
+from inference import InferenceSession
+from registry import current_model
+
+
+def measure(fn, frames, warmup=5):
+    for frame in frames[:warmup]:
+        fn(frame)
+
+    latencies = []
+    for frame in frames:
+        start = time.perf_counter()
+        fn(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return np.array(latencies)
+
+
+def summarize(name, latencies):
+    print(
+        f"[RESULT] {name:<28} média {latencies.mean():7.2f} ms | "
+        f"p50 {np.percentile(latencies, 50):7.2f} ms | "
+        f"p95 {np.percentile(latencies, 95):7.2f} ms | "
+        f"{1000 / latencies.mean():6.1f} fps"
+    )
+
+
+def main(model_filename, iterations=200):
+    tf.config.set_visible_devices([], "GPU")
+
+    print(f"[INFO] Carregando modelo '{model_filename}'...")
+    session = InferenceSession(model_filename)
+    model = session.model
+
+    rng = np.random.default_rng(0)
+    frames = [
+        rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8)
+        for _ in range(iterations)
+    ]
+
+    def keras_predict(frame):
+        return model.predict(session.preprocess([frame]), verbose=0)[0]
+
+    print(f"[INFO] Medindo {iterations} quadros por caminho (CPU)...")
+    before = measure(keras_predict, frames)
+    after = measure(session.predict_one, frames)
+
+    summarize("model.predict (antes)", before)
+    summarize("InferenceSession (depois)", after)
+    print(f"[RESULT] Ganho: {before.mean() / after.mean():.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    model_filename = args.model or current_model()
+    if not model_filename:
+        print("[ERRO] Nenhum modelo encontrado.")
+        sys.exit(1)
+
+    main(model_filename, args.iterations)
@@ -0,0 +1,148 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+RUNS = 3
+TOP_IMPORTS = 5
+HEAVY_MODULES = ("tensorflow", "cv2", "numpy")
+
+# módulos que cada ponto de entrada não pode carregar só por ser importado
+ENTRY_POINTS = {
+    "main": HEAVY_MODULES,
+    "detection_service": HEAVY_MODULES,
+    "service_client": HEAVY_MODULES,
+    "registry": HEAVY_MODULES,
+    "jobs": HEAVY_MODULES,
+    "predict": ("tensorflow",),
+    "arduino": ("tensorflow",),
+    "avaliar_modelo": ("tensorflow",),
+    "benchmark_detection": ("tensorflow",),
+}
+
+
+def parse_importtime(stderr):
+    """Lê a saída de `python -X importtime`.
+
+    Retorna {módulo: acumulado em us} e, para cada import de nível zero, os
+    imports diretos dele. O Python imprime os filhos antes do pai.
+    """
+    modules = {}
+    children = {}
+    pending = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        modules[name] = int(cumulative_us)
+        if depth == 1:
+            pending.append(name)
+        elif depth == 0:
+            children[name] = pending
+            pending = []
+    return modules, children
+
+
+def measure(module):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    modules, children = parse_importtime(result.stderr)
+    error = None
+    if result.returncode != 0:
+        error = result.stderr.strip().splitlines()[-1]
+    return wall, modules, children.get(module, []), error
+
+
+def benchmark(module, forbidden, runs=RUNS):
+    # a primeira execução paga o cache de disco; guarda a melhor
+    best = None
+    for _ in range(runs):
+        wall, modules, direct, error = measure(module)
+        if error:
+            return {"module": module, "error": error}
+        if best is None or wall < best[0]:
+            best = (wall, modules, direct)
+
+    wall, modules, direct = best
+    heaviest = sorted(direct, key=modules.get, reverse=True)
+    loaded = sorted(
+        name for name in forbidden if any(m.split(".")[0] == name for m in modules)
+    )
+    return {
+        "module": module,
+        "wall_ms": wall * 1000,
+        "import_ms": modules[module] / 1000,
+        "modules": len(modules),
+        "heaviest": {name: modules[name] / 1000 for name in heaviest[:TOP_IMPORTS]},
+        "forbidden_loaded": loaded,
+    }
+
+
+def check(results, budget_ms=None):
+    failures = []
+    for result in results:
+        module = result["module"]
+        if "error" in result:
+            failures.append(f"{module} não importou: {result['error']}")
+            continue
+        if result["forbidden_loaded"]:
+            failures.append(
+                f"{module} carrega {', '.join(result['forbidden_loaded'])} "
+                "ao ser importado"
+            )
+        if budget_ms is not None and result["import_ms"] > budget_ms:
+            failures.append(
+                f"{module} leva {result['import_ms']:.0f} ms para importar "
+                f"(limite {budget_ms:.0f} ms)"
+            )
+    return failures
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede o tempo de importação de cada ponto de entrada com "
+        "python -X importtime e acusa frameworks pesados carregados cedo demais."
+    )
+    parser.add_argument(
+        "--module",
+        action="append",
+        choices=sorted(ENTRY_POINTS),
+        default=None,
+        help="Ponto de entrada a medir (pode repetir; padrão: todos).",
+    )
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="Falha se algum módulo levar mais que isso para importar.",
+    )
+    parser.add_argument("--output", default=None, help="Salva o relatório JSON.")
+    args = parser.parse_args()
+
+    results = [
+        benchmark(module, ENTRY_POINTS[module], args.runs)
+        for module in args.module or ENTRY_POINTS
+    ]
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"[INFO] Relatório salvo em: {args.output}")
+
+    failures = check(results, args.budget_ms)
+    for failure in failures:
+        print(f"[ERRO] {failure}")
+    sys.exit(1 if failures else 0)
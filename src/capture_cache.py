@@ -0,0 +1,163 @@
+import os
+import json
+import shutil
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from frames import resize_to_input
+from shared import PROCESSED_DATA_DIR, CAPTURES_DIR, IMG_SIZE
+
+MANIFEST_FILE = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def manifest_path():
+    return os.path.join(PROCESSED_DATA_DIR, MANIFEST_FILE)
+
+
+def load_manifest():
+    path = manifest_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        print("[AVISO] Manifesto de cache inválido, reprocessando tudo.")
+        return {}
+    if (
+        manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("img_size") != IMG_SIZE
+    ):
+        return {}
+    return manifest.get("entries", {})
+
+
+def save_manifest(entries):
+    path = manifest_path()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(
+            {"version": MANIFEST_VERSION, "img_size": IMG_SIZE, "entries": entries},
+            f,
+        )
+    os.replace(tmp_path, path)
+
+
+def scan_captures():
+    labels = sorted(
+        d
+        for d in os.listdir(CAPTURES_DIR)
+        if os.path.isdir(os.path.join(CAPTURES_DIR, d))
+    )
+
+    captures = {}
+    for label in labels:
+        class_path = os.path.join(CAPTURES_DIR, label)
+        for file in sorted(os.listdir(class_path)):
+            img_path = os.path.join(class_path, file)
+            if not os.path.isfile(img_path):
+                continue
+            stat = os.stat(img_path)
+            key = f"{label}/{file}"
+            captures[key] = {
+                "label": label,
+                "mtime": stat.st_mtime_ns,
+                "size": stat.st_size,
+            }
+    return labels, captures
+
+
+def process_image(key):
+    src = os.path.join(CAPTURES_DIR, key)
+    dst = os.path.join(PROCESSED_DATA_DIR, key)
+    img = cv2.imread(src)
+    if img is None:
+        return key, False
+    img_resized = resize_to_input(img)
+    return key, bool(cv2.imwrite(dst, img_resized))
+
+
+def is_cached(entry, capture):
+    return (
+        entry is not None
+        and entry["mtime"] == capture["mtime"]
+        and entry["size"] == capture["size"]
+        and (
+            not entry["ok"]
+            or os.path.exists(os.path.join(PROCESSED_DATA_DIR, entry["key"]))
+        )
+    )
+
+
+def remove_stale(entries, captures, labels):
+    removed = 0
+    for key in list(entries):
+        if key in captures:
+            continue
+        processed = os.path.join(PROCESSED_DATA_DIR, key)
+        if os.path.exists(processed):
+            os.remove(processed)
+        del entries[key]
+        removed += 1
+
+    for name in os.listdir(PROCESSED_DATA_DIR):
+        path = os.path.join(PROCESSED_DATA_DIR, name)
+        if os.path.isdir(path) and name not in labels:
+            shutil.rmtree(path)
+            print(f"[INFO] Classe removida do cache: '{name}'")
+
+    return removed
+
+
+def update_cache(max_workers=None):
+    os.makedirs(PROCESSED_DATA_DIR, exist_ok=True)
+    labels, captures = scan_captures()
+    entries = load_manifest()
+
+    for label in labels:
+        os.makedirs(os.path.join(PROCESSED_DATA_DIR, label), exist_ok=True)
+
+    removed = remove_stale(entries, captures, labels)
+
+    pending = [
+        key
+        for key, capture in captures.items()
+        if not is_cached(entries.get(key), capture)
+    ]
+
+    if pending:
+        print(f"[INFO] Processando {len(pending)} imagens novas ou alteradas...")
+        workers = max_workers or os.cpu_count() or 1
+        chunksize = max(1, len(pending) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for key, ok in executor.map(process_image, pending, chunksize=chunksize):
+                capture = captures[key]
+                entries[key] = {
+                    "key": key,
+                    "label": capture["label"],
+                    "mtime": capture["mtime"],
+                    "size": capture["size"],
+                    "ok": ok,
+                }
+
+    save_manifest(entries)
+
+    print(
+        f"[INFO] Cache: {len(pending)} processadas, "
+        f"{len(captures) - len(pending)} reaproveitadas, {removed} removidas"
+    )
+
+    paths = []
+    y = []
+    for key in captures:
+        entry = entries[key]
+        if entry["ok"]:
+            paths.append(os.path.join(PROCESSED_DATA_DIR, key))
+            y.append(entry["label"])
+
+    counts = Counter(y)
+    for label in labels:
+        print(f"[INFO] Classe '{label}': {counts[label]} imagens")
+
+    return paths, y, labels
@@ -0,0 +1,121 @@
+import os
+import json
+import shutil
+import tensorflow as tf
+from registry import unpublish
+from shared import CHECKPOINTS_DIR
+
+STATE_FILE = "state.json"
+
+
+def checkpoint_dir(name="cnn"):
+    return os.path.join(CHECKPOINTS_DIR, name)
+
+
+def write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def new_state(labels, batch_size, best=None):
+    return {
+        "epoch": 0,
+        "checkpoint": None,
+        "labels": labels,
+        "batch_size": batch_size,
+        "best": best,
+        "published": None,
+    }
+
+
+def read_state(directory):
+    path = os.path.join(directory, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_checkpoint(directory):
+    """Retorna (modelo com o estado do otimizador, estado) ou None."""
+    state = read_state(directory)
+    if state is None or state["checkpoint"] is None:
+        return None
+    path = os.path.join(directory, state["checkpoint"])
+    if not os.path.exists(path):
+        return None
+    return tf.keras.models.load_model(path), state
+
+
+def finish(directory, final_model=None):
+    """Treino concluído: retira o modelo parcial publicado e apaga os checkpoints."""
+    state = read_state(directory)
+    if state and state["published"] not in (None, final_model):
+        unpublish(state["published"])
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class TrainingCheckpoint(tf.keras.callbacks.Callback):
+    """Salva pesos e otimizador a cada `every` épocas e publica o melhor modelo.
+
+    O modelo vai para epoch-<n>.keras e só depois o state.json passa a
+    apontar para ele (ambos com os.replace), então um processo morto no meio
+    da escrita deixa o checkpoint anterior intacto.
+
+    Sempre que `monitor` supera state["best"], publish_best(model, epoch,
+    value) publica o modelo e devolve o nome do arquivo; o parcial anterior
+    desta execução sai do registro, para que exista no máximo um por treino.
+    Com state["best"] iniciado pela acurácia do modelo já publicado, um parcial
+    só aparece quando é melhor que ele.
+    """
+
+    def __init__(
+        self, directory, state, publish_best=None, every=1, monitor="val_accuracy"
+    ):
+        super().__init__()
+        self.directory = directory
+        self.state = state
+        self.publish_best = publish_best
+        self.every = every
+        self.monitor = monitor
+
+    def on_epoch_end(self, epoch, logs=None):
+        value = (logs or {}).get(self.monitor)
+        if value is not None and (
+            self.state["best"] is None or value > self.state["best"]
+        ):
+            self.state["best"] = float(value)
+            if self.publish_best is not None:
+                self._publish(epoch + 1, float(value))
+
+        if (epoch + 1) % self.every == 0:
+            self.save(epoch + 1)
+
+    def _publish(self, epoch, value):
+        previous = self.state["published"]
+        self.state["published"] = self.publish_best(self.model, epoch, value)
+        self._write_state()
+        if previous not in (None, self.state["published"]):
+            unpublish(previous)
+
+    def _write_state(self):
+        os.makedirs(self.directory, exist_ok=True)
+        write_json_atomic(os.path.join(self.directory, STATE_FILE), self.state)
+
+    def save(self, epoch):
+        os.makedirs(self.directory, exist_ok=True)
+        filename = f"epoch-{epoch}.keras"
+        tmp_path = os.path.join(self.directory, f"epoch-{epoch}.tmp.keras")
+        self.model.save(tmp_path)
+        os.replace(tmp_path, os.path.join(self.directory, filename))
+
+        previous = self.state["checkpoint"]
+        self.state.update(epoch=epoch, checkpoint=filename)
+        self._write_state()
+        if previous not in (None, filename):
+            os.remove(os.path.join(self.directory, previous))
+        print(f"[INFO] Checkpoint salvo: época {epoch}")
@@ -0,0 +1,194 @@
+import os
+import sys
+import queue
+import argparse
+import threading
+from multiprocessing.connection import Listener
+from model_watcher import ModelWatcher
+from registry import current_model
+from shared import BACKENDS, SERVICE_AUTHKEY_ENV, SERVICE_HOST, SERVICE_PORT
+
+
+class DetectionService:
+    def __init__(self, backend="auto", num_threads=None):
+        self.backend = backend
+        self.num_threads = num_threads
+        self.active_model = None
+        self.watcher = None
+        self.port_map = None
+        self.requests = queue.Queue()
+        self.stop_event = threading.Event()
+        self.running_mode = None
+        self.loading = None
+        self._load_lock = threading.Lock()
+
+    def load(self, model_filename=None):
+        """Carrega o primeiro modelo; as trocas seguintes são do ModelWatcher."""
+        with self._load_lock:
+            if self.active_model is not None:
+                return
+            model_filename = model_filename or current_model()
+            if not model_filename:
+                raise FileNotFoundError("Nenhum modelo encontrado.")
+
+            # importado aqui para o serviço abrir a porta de controle antes de
+            # carregar OpenCV e o runtime do modelo
+            from inference import ActiveModel
+
+            self.loading = model_filename
+            try:
+                print(f"[INFO] Carregando modelo '{model_filename}'...")
+                self.active_model = ActiveModel(
+                    model_filename, self.backend, self.num_threads
+                )
+            finally:
+                self.loading = None
+            # pega também modelos treinados fora da interface
+            self.watcher = ModelWatcher(
+                self.active_model, current_model, on_swap=self._on_swap
+            )
+            self.watcher.start()
+        print(f"[INFO] Modelo pronto: {model_filename}")
+
+    def _on_swap(self, labels):
+        port_map = self.port_map
+        if port_map is not None:
+            import arduino
+
+            arduino.validate_port_map(port_map, labels)
+
+    def _swap_in_background(self, model_filename):
+        try:
+            if self.watcher is None:
+                self.load(model_filename)
+            else:
+                # o aviso da interface só antecipa a verificação periódica
+                self.watcher.check()
+        except Exception as e:
+            print(f"[ERRO] Falha ao carregar modelo: {e}")
+
+    def status(self):
+        return {
+            "ok": True,
+            "model": self.active_model.model_filename if self.active_model else None,
+            "loading": self.loading,
+            "running": self.running_mode,
+        }
+
+    def handle(self, message):
+        command = message.get("cmd")
+
+        if command == "status":
+            return self.status()
+
+        if command == "start":
+            if self.running_mode is not None:
+                return {"ok": False, "error": "Detecção já está em execução."}
+            if message.get("mode") not in ("predict", "arduino"):
+                return {"ok": False, "error": "Modo inválido."}
+            self.running_mode = message["mode"]
+            self.requests.put(message)
+            return {"ok": True}
+
+        if command == "stop":
+            self.stop_event.set()
+            return {"ok": True}
+
+        if command == "swap_model":
+            threading.Thread(
+                target=self._swap_in_background,
+                args=(message.get("model"),),
+                daemon=True,
+            ).start()
+            return {"ok": True}
+
+        if command == "shutdown":
+            self.stop_event.set()
+            self.requests.put(None)
+            return {"ok": True}
+
+        return {"ok": False, "error": f"Comando desconhecido: {command}"}
+
+    def serve(self, listener):
+        while True:
+            try:
+                with listener.accept() as conn:
+                    conn.send(self.handle(conn.recv()))
+            except (EOFError, OSError) as e:
+                print(f"[AVISO] Conexão de controle encerrada: {e}")
+
+    def run_detection(self, request):
+        import arduino
+        import predict
+        from scheduler import InferenceScheduler
+
+        if self.active_model is None:
+            self.load()
+
+        if request["mode"] == "arduino":
+            arduino.validate_port_map(request["port_map"], self.active_model.get()[1])
+            link = arduino.open_serial(request["serial_port"])
+            captures = predict.open_sources(request.get("sources", ["0"]))
+            # trocas de modelo durante a detecção revalidam o mapa de pinos
+            self.port_map = request["port_map"]
+            try:
+                arduino.run(
+                    self.active_model,
+                    captures,
+                    [link] * len(captures),
+                    [request["port_map"]] * len(captures),
+                    self.stop_event,
+                    scheduler=InferenceScheduler(),
+                )
+            finally:
+                self.port_map = None
+        else:
+            captures = predict.open_sources(request.get("sources", ["0"]))
+            predict.run(
+                self.active_model,
+                captures,
+                self.stop_event,
+                scheduler=InferenceScheduler(),
+            )
+
+    def run(self, address, authkey):
+        listener = Listener(address, authkey=authkey)
+        threading.Thread(target=self.serve, args=(listener,), daemon=True).start()
+        print(f"[INFO] Serviço de detecção ouvindo em {address[0]}:{address[1]}")
+
+        try:
+            self.load()
+        except FileNotFoundError as e:
+            print(f"[AVISO] {e} O serviço aguardará um modelo.")
+
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+
+            self.stop_event.clear()
+            try:
+                self.run_detection(request)
+            except Exception as e:
+                print(f"[ERRO] Falha na detecção: {e}")
+            finally:
+                self.running_mode = None
+
+        listener.close()
+        print("[INFO] Serviço de detecção encerrado.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=SERVICE_PORT)
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    authkey = os.environ.get(SERVICE_AUTHKEY_ENV)
+    if not authkey:
+        print(f"[ERRO] Defina {SERVICE_AUTHKEY_ENV} para iniciar o serviço.")
+        sys.exit(1)
+
+    service = DetectionService(args.backend, args.threads)
+    service.run((SERVICE_HOST, args.port), authkey.encode())
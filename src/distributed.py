@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+import socket
+import subprocess
+from shared import CHECKPOINTS_DIR
+
+TF_CONFIG_ENV = "TF_CONFIG"
+
+
+def free_ports(count):
+    sockets = []
+    try:
+        for _ in range(count):
+            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            s.bind(("localhost", 0))
+            sockets.append(s)
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+def cluster_config(ports, index):
+    return {
+        "cluster": {"worker": [f"localhost:{port}" for port in ports]},
+        "task": {"type": "worker", "index": index},
+    }
+
+
+def without_option(argv, option):
+    """Remove `option valor` e `option=valor` de argv."""
+    result = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == option:
+            skip = True
+        elif not arg.startswith(option + "="):
+            result.append(arg)
+    return result
+
+
+def launch_local_workers(num_workers, argv, intra_op_threads=None):
+    """Roda o treino em num_workers processos locais, cada um com seu TF_CONFIG.
+
+    Serve para testar o modo distribuído numa máquina só; os núcleos são
+    divididos entre os processos quando intra_op_threads não foi definido.
+    Retorna o código de saída do chefe (worker 0).
+    """
+    from pre_process import load_shards
+
+    # os shards são gerados uma vez aqui; os workers só os leem
+    load_shards()
+
+    argv = [*argv, "--distributed"]
+    if intra_op_threads is None:
+        threads = max(1, (os.cpu_count() or 1) // num_workers)
+        argv += ["--intra-op-threads", str(threads)]
+
+    ports = free_ports(num_workers)
+    workers = []
+    for index in range(num_workers):
+        env = dict(os.environ)
+        env[TF_CONFIG_ENV] = json.dumps(cluster_config(ports, index))
+        print(f"[INFO] Iniciando worker {index} em localhost:{ports[index]}")
+        workers.append(subprocess.Popen([sys.executable, *argv], env=env))
+
+    try:
+        codes = [worker.wait() for worker in workers]
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()
+        raise
+    failed = [i for i, code in enumerate(codes) if code != 0]
+    if failed:
+        print(f"[ERRO] Workers com falha: {failed}")
+    return codes[0]
+
+
+def task_info():
+    tf_config = json.loads(os.environ.get(TF_CONFIG_ENV, "{}"))
+    task = tf_config.get("task", {})
+    return task.get("type", "worker"), task.get("index", 0)
+
+
+def is_chief():
+    task_type, index = task_info()
+    return task_type == "chief" or (task_type == "worker" and index == 0)
+
+
+def create_strategy():
+    import tensorflow as tf
+
+    if TF_CONFIG_ENV not in os.environ:
+        raise ValueError(f"Defina {TF_CONFIG_ENV} ou use --workers N.")
+    return tf.distribute.MultiWorkerMirroredStrategy()
+
+
+def backup_dir():
+    # cada worker guarda seu próprio backup para não disputar os arquivos
+    task_type, index = task_info()
+    return os.path.join(CHECKPOINTS_DIR, "distributed", f"{task_type}-{index}")
+
+
+def sharded_dataset(strategy, store, indices, batch_size, training=False):
+    """Cada worker lê só a sua fatia dos índices e repete indefinidamente.
+
+    Retorna (dataset distribuído, passos por época). Todos os workers rodam o
+    mesmo número de passos, calculado pela menor fatia, para que nenhum fique
+    esperando os outros numa redução coletiva.
+    """
+    import tensorflow as tf
+    from pre_process import AUGMENTATIONS_PER_IMAGE, build_dataset
+
+    num_classes = len(store.labels)
+    spec = strategy.cluster_resolver.cluster_spec()
+    workers = sum(spec.num_tasks(job) for job in spec.jobs if job != "ps")
+    samples = len(indices) // workers
+    if training:
+        samples *= AUGMENTATIONS_PER_IMAGE
+    steps = max(1, samples // batch_size)
+
+    def dataset_fn(context):
+        shard = indices[context.input_pipeline_id :: context.num_input_pipelines]
+        ds = build_dataset(store, shard, num_classes, batch_size, training)
+        return ds.repeat()
+
+    options = tf.distribute.InputOptions(experimental_fetch_to_device=False)
+    return strategy.distribute_datasets_from_function(dataset_fn, options), steps
@@ -0,0 +1,116 @@
+import os
+import hashlib
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+from pre_process import AUGMENTATIONS_PER_IMAGE, apply_augmentation
+from shared import BACKBONES_DIR, EMBEDDINGS_DIR, IMG_SIZE
+
+BACKBONES = {
+    "mobilenet_v3_small": tf.keras.applications.MobileNetV3Small,
+    "mobilenet_v3_large": tf.keras.applications.MobileNetV3Large,
+}
+EMBEDDING_BATCH = 64
+
+
+def default_weights_path(backbone):
+    return os.path.join(BACKBONES_DIR, f"{backbone}_notop.h5")
+
+
+def bgr_to_rgb_layer():
+    # as capturas e os quadros da câmera são BGR; os pesos pré-treinados esperam RGB
+    swap = layers.Conv2D(3, 1, use_bias=False, trainable=False, name="bgr_to_rgb")
+    swap.build((None, IMG_SIZE, IMG_SIZE, 3))
+    swap.set_weights([np.eye(3, dtype=np.float32)[::-1].reshape(1, 1, 3, 3)])
+    return swap
+
+
+def build_feature_extractor(backbone, weights_path=None):
+    if backbone not in BACKBONES:
+        raise ValueError(f"Backbone desconhecido: {backbone}")
+
+    weights_path = weights_path or default_weights_path(backbone)
+    if not os.path.exists(weights_path):
+        raise FileNotFoundError(
+            f"Pesos do backbone '{backbone}' não encontrados em '{weights_path}'."
+        )
+
+    base = BACKBONES[backbone](
+        input_shape=(IMG_SIZE, IMG_SIZE, 3),
+        include_top=False,
+        weights=None,
+        pooling="avg",
+    )
+    base.load_weights(weights_path)
+    base.trainable = False
+
+    inputs = layers.Input(shape=(IMG_SIZE, IMG_SIZE, 3))
+    # MobileNetV3 já normaliza internamente a partir de pixels 0-255
+    x = bgr_to_rgb_layer()(inputs)
+    outputs = base(x, training=False)
+    return models.Model(inputs, outputs, name=f"{backbone}_features")
+
+
+def feature_cache_name(extractor):
+    digest = hashlib.sha1()
+    for weights in extractor.get_weights():
+        digest.update(np.ascontiguousarray(weights).tobytes())
+    return f"{extractor.name}_{digest.hexdigest()[:10]}"
+
+
+def sample_key(path):
+    stat = os.stat(path)
+    return f"{path}|{stat.st_mtime_ns}|{stat.st_size}"
+
+
+def load_cache(path):
+    if not os.path.exists(path):
+        return {}, None
+    data = np.load(path, allow_pickle=False)
+    keys = data["keys"].tolist()
+    return {key: i for i, key in enumerate(keys)}, data["embeddings"]
+
+
+def augmented_batch(images):
+    variants = tf.map_fn(
+        apply_augmentation,
+        tf.convert_to_tensor(images),
+        fn_output_signature=tf.float32,
+    )
+    return tf.reshape(variants, (-1, IMG_SIZE, IMG_SIZE, 3))
+
+
+def compute_embeddings(store, extractor, name, batch_size=EMBEDDING_BATCH):
+    path = os.path.join(EMBEDDINGS_DIR, f"{name}.npz")
+    cached, cached_embeddings = load_cache(path)
+
+    keys = [sample_key(p) for p in store.paths]
+    dim = extractor.output_shape[-1]
+    embeddings = np.empty((len(keys), AUGMENTATIONS_PER_IMAGE, dim), dtype=np.float32)
+
+    missing = []
+    for i, key in enumerate(keys):
+        if key in cached:
+            embeddings[i] = cached_embeddings[cached[key]]
+        else:
+            missing.append(i)
+
+    print(
+        f"[INFO] Embeddings: {len(keys) - len(missing)} em cache, "
+        f"{len(missing)} a calcular ({name})"
+    )
+
+    for start in range(0, len(missing), batch_size):
+        indices = missing[start : start + batch_size]
+        features = extractor(augmented_batch(store.images(indices)), training=False)
+        embeddings[indices] = features.numpy().reshape(
+            len(indices), AUGMENTATIONS_PER_IMAGE, dim
+        )
+
+    if missing or len(cached) != len(keys):
+        os.makedirs(EMBEDDINGS_DIR, exist_ok=True)
+        tmp_path = path.replace(".npz", ".tmp.npz")
+        np.savez(tmp_path, keys=np.array(keys), embeddings=embeddings)
+        os.replace(tmp_path, path)
+
+    return embeddings
@@ -0,0 +1,260 @@
+import threading
+import time
+from collections import deque
+
+STATS_INTERVAL = 5.0
+LATENCY_SAMPLES = 10000
+
+
+class LatestQueue:
+    def __init__(self, maxsize=1, drop=True):
+        self.items = deque(maxlen=maxsize)
+        self.cond = threading.Condition()
+        self.drop = drop
+        self.dropped = 0
+        self.max_depth = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.cond:
+            # sem descarte (replay offline), espera o consumidor abrir espaço
+            while not self.drop and len(self.items) == self.items.maxlen:
+                if self.closed:
+                    return
+                self.cond.wait()
+            if len(self.items) == self.items.maxlen:
+                self.dropped += 1
+            self.items.append(item)
+            self.max_depth = max(self.max_depth, len(self.items))
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self.cond:
+            while not self.items and not self.closed:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            if not self.items:
+                return None
+            item = self.items.popleft()
+            self.cond.notify_all()
+            return item
+
+    def depth(self):
+        with self.cond:
+            return len(self.items)
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+
+class StageStats:
+    def __init__(self, name, window=1.0):
+        self.name = name
+        self.window = window
+        self.count = 0
+        self.fps = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self._window_start = time.perf_counter()
+        self._window_count = 0
+        self._lock = threading.Lock()
+
+    def tick(self, duration=None):
+        with self._lock:
+            now = time.perf_counter()
+            self.count += 1
+            if duration is not None:
+                self.latencies.append(duration)
+            self._window_count += 1
+            elapsed = now - self._window_start
+            if elapsed >= self.window:
+                self.fps = self._window_count / elapsed
+                self._window_start = now
+                self._window_count = 0
+
+
+class DetectionPipeline:
+    """Captura de várias fontes com inferência em lote.
+
+    Cada fonte tem sua thread de captura e sua fila (só o quadro mais recente).
+    A cada ciclo a thread de inferência junta o quadro mais novo de cada fonte
+    e roda todos em um único lote.
+
+    on_result(index, frame, result, fresh) recebe fresh=False quando o
+    agendador pulou a fonte e result é o da última inferência dela.
+    """
+
+    def __init__(
+        self,
+        captures,
+        infer_batch,
+        queue_size=1,
+        stop_event=None,
+        drop_frames=True,
+        scheduler=None,
+    ):
+        self.captures = list(captures)
+        self.infer_batch = infer_batch
+        self.scheduler = scheduler
+        self.frames = [LatestQueue(queue_size, drop_frames) for _ in self.captures]
+        self.results = LatestQueue(queue_size, drop_frames)
+        self.stop_event = stop_event or threading.Event()
+        self.failed_sources = set()
+        self.error = None
+        self.batches = 0
+        self.batched_frames = 0
+        self.stats = {
+            "captura": StageStats("captura"),
+            "inferencia": StageStats("inferencia"),
+            "saida": StageStats("saida"),
+        }
+        self._last_results = {}
+        self._new_frame = threading.Event()
+        self._threads = []
+
+    @property
+    def capture_failed(self):
+        return bool(self.failed_sources)
+
+    def _grab_loop(self, index):
+        capture = self.captures[index]
+        frames = self.frames[index]
+        try:
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                ret, frame = capture.read()
+                if not ret:
+                    self.failed_sources.add(index)
+                    break
+                self.stats["captura"].tick(time.perf_counter() - start)
+                frames.put(frame)
+                self._new_frame.set()
+        finally:
+            frames.close()
+            self._new_frame.set()
+
+    def _collect(self):
+        batch = []
+        for index, frames in enumerate(self.frames):
+            frame = frames.get(timeout=0)
+            if frame is not None:
+                batch.append((index, frame))
+        return batch
+
+    def _infer(self, batch):
+        start = time.perf_counter()
+        predictions, labels = self.infer_batch([frame for _, frame in batch])
+        duration = time.perf_counter() - start
+        if self.scheduler is not None:
+            self.scheduler.record(start, duration)
+
+        for (index, _), prediction in zip(batch, predictions):
+            self._last_results[index] = (prediction, labels)
+        self.batches += 1
+        self.batched_frames += len(batch)
+        for _ in batch:
+            self.stats["inferencia"].tick(duration / len(batch))
+
+    def _infer_loop(self):
+        try:
+            while not self.stop_event.is_set():
+                self._new_frame.wait(0.1)
+                self._new_frame.clear()
+                batch = self._collect()
+                if not batch:
+                    if all(frames.closed for frames in self.frames):
+                        break
+                    continue
+
+                selected = batch
+                if self.scheduler is not None:
+                    selected = self.scheduler.select(batch)
+                if selected:
+                    self._infer(selected)
+
+                # fontes sem inferência neste ciclo reaproveitam o último resultado
+                fresh = {index for index, _ in selected}
+                self.results.put(
+                    [
+                        (index, frame, self._last_results[index], index in fresh)
+                        for index, frame in batch
+                        if index in self._last_results
+                    ]
+                )
+        except Exception as e:
+            self.error = e
+        finally:
+            self.results.close()
+
+    def start(self):
+        self._threads = [
+            threading.Thread(
+                target=self._grab_loop, args=(i,), name=f"captura-{i}", daemon=True
+            )
+            for i in range(len(self.captures))
+        ]
+        self._threads.append(
+            threading.Thread(target=self._infer_loop, name="inferencia", daemon=True)
+        )
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self._new_frame.set()
+        for frames in [*self.frames, self.results]:
+            frames.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+
+    def run(self, on_result, stats_interval=STATS_INTERVAL):
+        self.start()
+        last_report = time.perf_counter()
+        try:
+            while not self.stop_event.is_set():
+                batch = self.results.get(timeout=0.1)
+                if batch is None:
+                    if self.results.closed:
+                        break
+                    continue
+                stop = False
+                for item in batch:
+                    start = time.perf_counter()
+                    stop = on_result(*item) is False
+                    self.stats["saida"].tick(time.perf_counter() - start)
+                    if stop:
+                        break
+                if stop:
+                    break
+
+                now = time.perf_counter()
+                if stats_interval and now - last_report >= stats_interval:
+                    print(self.report())
+                    last_report = now
+        finally:
+            self.stop()
+            for capture in self.captures:
+                capture.release()
+
+        if self.error is not None:
+            raise self.error
+        print(self.report())
+
+    def report(self):
+        stages = " | ".join(
+            f"{stats.name} {stats.fps:.1f} fps" for stats in self.stats.values()
+        )
+        mean_batch = self.batched_frames / self.batches if self.batches else 0.0
+        scheduled = f"{self.scheduler.report()} | " if self.scheduler else ""
+        return (
+            f"[STATS] {stages} | lote médio {mean_batch:.1f} | {scheduled}"
+            f"fila quadros {sum(f.depth() for f in self.frames)} "
+            f"(max {max(f.max_depth for f in self.frames)}, "
+            f"descartados {sum(f.dropped for f in self.frames)}) | "
+            f"fila resultados {self.results.depth()} (max {self.results.max_depth}, "
+            f"descartados {self.results.dropped})"
+        )
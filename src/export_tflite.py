@@ -0,0 +1,90 @@
+import os
+import numpy as np
+import tensorflow as tf
+from inference import TFLiteSession, tflite_filename
+from shards import ShardedDataset
+from shared import INPUT_SCALE_RAW, MODELS_FOLDER
+
+QUANTIZATIONS = ("fp16", "int8")
+CALIBRATION_SAMPLES = 200
+
+
+def load_calibration_images(
+    num_samples=CALIBRATION_SAMPLES, seed=42, scale=INPUT_SCALE_RAW
+):
+    store = ShardedDataset()
+    images = store.images(store.sample(num_samples, seed))
+    return list(images.astype(np.float32) * scale)
+
+
+def convert(model, quantization, calibration_images=None):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if quantization == "fp16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        if not calibration_images:
+            raise ValueError("Quantização int8 requer imagens de calibração.")
+
+        def representative_dataset():
+            for img in calibration_images:
+                yield [img[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError(f"Quantização desconhecida: {quantization}")
+
+    return converter.convert()
+
+
+def tflite_accuracy(path, dataset):
+    session = TFLiteSession(path)
+    correct = 0
+    total = 0
+    for images, labels in dataset:
+        predictions = session.predict_array(images.numpy())
+        matches = predictions.argmax(axis=1) == labels.numpy().argmax(axis=1)
+        correct += int(np.sum(matches))
+        total += len(predictions)
+    return correct / total if total > 0 else 0.0
+
+
+def export_tflite(
+    model,
+    model_filename,
+    quantizations=QUANTIZATIONS,
+    test_ds=None,
+    keras_acc=None,
+):
+    calibration_images = None
+    if "int8" in quantizations:
+        print("[INFO] Carregando amostras de calibração para int8...")
+        calibration_images = load_calibration_images()
+
+    exported = []
+    for quantization in quantizations:
+        filename = tflite_filename(model_filename, quantization)
+        path = os.path.join(MODELS_FOLDER, filename)
+        print(f"[INFO] Exportando TFLite ({quantization})...")
+
+        tflite_model = convert(model, quantization, calibration_images)
+        with open(path, "wb") as f:
+            f.write(tflite_model)
+        size_kb = len(tflite_model) / 1024
+        print(f"[INFO] Modelo TFLite salvo em: {path} ({size_kb:.0f} KB)")
+
+        if test_ds is not None:
+            acc = tflite_accuracy(path, test_ds)
+            if keras_acc is not None:
+                print(
+                    f"[RESULT] Acurácia TFLite {quantization}: {acc:.2%} "
+                    f"(Keras {keras_acc:.2%}, delta {(acc - keras_acc) * 100:+.2f} p.p.)"
+                )
+            else:
+                print(f"[RESULT] Acurácia TFLite {quantization}: {acc:.2%}")
+
+        exported.append(filename)
+
+    return exported
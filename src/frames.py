@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+from shared import IMG_SIZE, INPUT_SCALE_RAW
+
+RESIZE_INTERPOLATION = cv2.INTER_LINEAR
+
+
+def resize_to_input(img, dst=None):
+    """Redimensiona como no treino; usado pelas capturas, shards e detecção."""
+    if img.shape[:2] == (IMG_SIZE, IMG_SIZE):
+        return img
+    return cv2.resize(
+        img, (IMG_SIZE, IMG_SIZE), dst=dst, interpolation=RESIZE_INTERPOLATION
+    )
+
+
+class FramePreprocessor:
+    """Converte quadros BGR em um lote float32 sem alocar a cada chamada.
+
+    O quadro é redimensionado para um buffer uint8 fixo (cv2.resize só escreve
+    no mesmo tipo da origem) e copiado com conversão para o lote float32
+    pré-alocado, que cresce só quando chega um lote maior.
+    """
+
+    def __init__(self, input_scale=INPUT_SCALE_RAW, max_batch=1):
+        self.input_scale = input_scale
+        self._resized = np.empty((IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+        self._batch = np.empty((max_batch, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+
+    def __call__(self, frames):
+        count = len(frames)
+        if count > len(self._batch):
+            self._batch = np.empty((count, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+
+        batch = self._batch[:count]
+        for slot, frame in zip(batch, frames):
+            np.copyto(slot, resize_to_input(frame, self._resized), casting="unsafe")
+        if self.input_scale != INPUT_SCALE_RAW:
+            np.multiply(batch, self.input_scale, out=batch)
+        return batch
@@ -0,0 +1,194 @@
+import os
+import sys
+import json
+import argparse
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers, models
+from embeddings import compute_embeddings, feature_cache_name
+from pre_process import AUGMENTATIONS_PER_IMAGE, load_splits
+from registry import current_model, input_scale, publish
+from shared import INPUT_SCALE_RAW, MODEL_EXT, MODELS_FOLDER
+from train_model import ProgressReporter, save_model
+
+HEAD_EPOCHS = 15
+
+
+def load_model_and_labels(model_filename):
+    model = tf.keras.models.load_model(os.path.join(MODELS_FOLDER, model_filename))
+    label_path = os.path.join(
+        MODELS_FOLDER, model_filename.replace(MODEL_EXT, ".labels.json")
+    )
+    with open(label_path, "r") as f:
+        return model, json.load(f)
+
+
+def split_classifier(model):
+    last = model.layers[-1]
+    if isinstance(last, models.Model):
+        # backbone + cabeça (train_model.combine)
+        return model.layers[-2], last.layers[-1]
+    if isinstance(model.layers[-2], models.Model):
+        # modelo já gerado por este módulo
+        return model.layers[-2], last
+    return models.Model(model.inputs, model.layers[-2].output), last
+
+
+def accept_raw_pixels(feature_model, model_filename):
+    # modelos antigos esperam a imagem já dividida por 255: a normalização
+    # passa para dentro do modelo, como nos modelos novos
+    scale = input_scale(model_filename)
+    if scale == INPUT_SCALE_RAW:
+        return feature_model
+    inputs = layers.Input(shape=feature_model.input_shape[1:])
+    outputs = feature_model(layers.Rescaling(scale)(inputs))
+    return models.Model(inputs, outputs, name=feature_model.name)
+
+
+def assemble(feature_model, dense):
+    inputs = layers.Input(shape=feature_model.input_shape[1:])
+    model = models.Model(inputs, dense(feature_model(inputs)))
+    model.compile(
+        optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"]
+    )
+    return model
+
+
+def fit_dense(weights, X_train, y_train, X_test, y_test, epochs=HEAD_EPOCHS):
+    head = models.Sequential(
+        [
+            layers.Input(shape=(X_train.shape[1],)),
+            layers.Dense(weights[1].shape[0], activation="softmax"),
+        ]
+    )
+    head.layers[-1].set_weights(weights)
+    head.compile(
+        optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"]
+    )
+    head.fit(
+        X_train,
+        y_train,
+        epochs=epochs,
+        batch_size=64,
+        callbacks=[ProgressReporter(batch_size=64)],
+        verbose=2,
+    )
+    loss, acc = head.evaluate(X_test, y_test, verbose=0)
+    return head.layers[-1], acc
+
+
+def select_samples(store, indices, labels):
+    label_to_index = {label: i for i, label in enumerate(labels)}
+    mapping = np.array(
+        [label_to_index.get(label, -1) for label in store.labels], dtype=np.int32
+    )
+    targets = mapping[store.label_indices[indices]]
+    keep = targets >= 0
+    return np.asarray(indices)[keep], targets[keep]
+
+
+def add_item(label, model_filename=None):
+    model_filename = model_filename or current_model()
+    if not model_filename:
+        raise FileNotFoundError("Nenhum modelo encontrado para atualizar.")
+
+    model, labels = load_model_and_labels(model_filename)
+    if label in labels:
+        raise ValueError(f"O item '{label}' já faz parte do modelo.")
+
+    store, (train_idx, val_idx, test_idx) = load_splits()
+    if label not in store.labels:
+        raise FileNotFoundError(f"Nenhuma captura encontrada para '{label}'.")
+
+    print(f"[INFO] Adicionando '{label}' ao modelo '{model_filename}'...")
+    feature_model, dense = split_classifier(model)
+    feature_model = accept_raw_pixels(feature_model, model_filename)
+    embeddings = compute_embeddings(
+        store, feature_model, feature_cache_name(feature_model)
+    )
+    dim = embeddings.shape[-1]
+
+    new_labels = labels + [label]
+    kernel, bias = dense.get_weights()
+    kernel = np.concatenate([kernel, kernel.mean(axis=1, keepdims=True)], axis=1)
+    bias = np.append(bias, bias.mean())
+
+    train_idx, y_train = select_samples(
+        store, np.concatenate([train_idx, val_idx]), new_labels
+    )
+    test_idx, y_test = select_samples(store, test_idx, new_labels)
+
+    num_classes = len(new_labels)
+    X_train = embeddings[train_idx].reshape(-1, dim)
+    y_train = tf.keras.utils.to_categorical(
+        np.repeat(y_train, AUGMENTATIONS_PER_IMAGE), num_classes
+    )
+    X_test = embeddings[test_idx, 0]
+    y_test = tf.keras.utils.to_categorical(y_test, num_classes)
+
+    print("[INFO] Ajustando apenas a camada de saída...")
+    new_dense, acc = fit_dense([kernel, bias], X_train, y_train, X_test, y_test)
+    print(f"[RESULT] Acurácia no teste: {acc:.2%}")
+
+    new_filename = save_model(assemble(feature_model, new_dense), new_labels)
+    publish(
+        new_filename,
+        new_labels,
+        acc,
+        source="incremental",
+        parent=model_filename,
+        input_scale=INPUT_SCALE_RAW,
+    )
+    return new_filename
+
+
+def remove_item(label, model_filename=None):
+    model_filename = model_filename or current_model()
+    if not model_filename:
+        raise FileNotFoundError("Nenhum modelo encontrado para atualizar.")
+
+    model, labels = load_model_and_labels(model_filename)
+    if label not in labels:
+        raise ValueError(f"O item '{label}' não faz parte do modelo.")
+    if len(labels) <= 2:
+        raise ValueError("O modelo precisa manter pelo menos dois itens.")
+
+    print(f"[INFO] Removendo '{label}' do modelo '{model_filename}'...")
+    feature_model, dense = split_classifier(model)
+    feature_model = accept_raw_pixels(feature_model, model_filename)
+    kernel, bias = dense.get_weights()
+    keep = [i for i, name in enumerate(labels) if name != label]
+
+    new_dense = layers.Dense(len(keep), activation="softmax")
+    new_dense.build((None, kernel.shape[0]))
+    new_dense.set_weights([kernel[:, keep], bias[keep]])
+
+    new_labels = [labels[i] for i in keep]
+    new_filename = save_model(assemble(feature_model, new_dense), new_labels)
+    publish(
+        new_filename,
+        new_labels,
+        source="incremental",
+        parent=model_filename,
+        input_scale=INPUT_SCALE_RAW,
+    )
+    return new_filename
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("action", choices=["add", "remove"])
+    parser.add_argument("label")
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+
+    try:
+        if args.action == "add":
+            add_item(args.label, args.model)
+        else:
+            remove_item(args.label, args.model)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERRO] {e}")
+        sys.exit(1)
+
+    print("[INFO] Concluído!")
@@ -0,0 +1,205 @@
+import os
+import threading
+import numpy as np
+from frames import FramePreprocessor
+from registry import input_scale, load_labels
+from shared import BACKENDS, IMG_SIZE, MODEL_EXT, MODELS_FOLDER, TFLITE_EXT
+
+TFLITE_PREFERENCE = ("int8", "fp16")
+
+
+def tflite_filename(model_filename, quantization):
+    return model_filename.replace(MODEL_EXT, f".{quantization}{TFLITE_EXT}")
+
+
+def load_tflite_interpreter(model_path, num_threads=None):
+    try:
+        from tflite_runtime.interpreter import Interpreter
+    except ImportError:
+        try:
+            from ai_edge_litert.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+    return Interpreter(model_path=model_path, num_threads=num_threads)
+
+
+class InferenceSession:
+    def __init__(self, model_filename, warmup_runs=2, scale=None):
+        import tensorflow as tf
+
+        self.model_filename = model_filename
+        self.model_path = os.path.join(MODELS_FOLDER, model_filename)
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"Modelo '{self.model_path}' não encontrado.")
+
+        self.model = tf.keras.models.load_model(self.model_path)
+        self.input_shape = (IMG_SIZE, IMG_SIZE, 3)
+        self.num_classes = self.model.output_shape[-1]
+        self.preprocessor = FramePreprocessor(
+            input_scale(model_filename) if scale is None else scale
+        )
+        self._forward = tf.function(
+            self._call_model,
+            input_signature=[tf.TensorSpec([None, *self.input_shape], tf.float32)],
+            reduce_retracing=True,
+        )
+        self.warmup(warmup_runs)
+
+    def _call_model(self, batch):
+        return self.model(batch, training=False)
+
+    def warmup(self, runs=2):
+        dummy = np.zeros((1, *self.input_shape), dtype=np.float32)
+        for _ in range(runs):
+            self._forward(dummy)
+
+    def preprocess(self, frames):
+        return self.preprocessor(frames)
+
+    def predict_array(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        return self._forward(batch).numpy()
+
+    def predict_one(self, frame):
+        return self.predict_array(self.preprocess([frame]))[0]
+
+    def predict_batch(self, frames):
+        if len(frames) == 0:
+            return np.empty((0, self.num_classes), dtype=np.float32)
+        return self.predict_array(self.preprocess(frames))
+
+
+class TFLiteSession:
+    def __init__(self, model_path, num_threads=None, warmup_runs=2, scale=None):
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Modelo '{model_path}' não encontrado.")
+
+        self.model_path = model_path
+        self.model_filename = os.path.basename(model_path)
+        self.interpreter = load_tflite_interpreter(model_path, num_threads)
+        self.interpreter.allocate_tensors()
+
+        input_details = self.interpreter.get_input_details()[0]
+        output_details = self.interpreter.get_output_details()[0]
+        self._input_index = input_details["index"]
+        self._output_index = output_details["index"]
+        self._input_dtype = input_details["dtype"]
+        self._input_quant = input_details["quantization"]
+        self._output_quant = output_details["quantization"]
+        self._batch_size = 1
+
+        self.input_shape = tuple(input_details["shape"][1:])
+        self.num_classes = int(output_details["shape"][-1])
+        self.preprocessor = FramePreprocessor(
+            input_scale(self.model_filename) if scale is None else scale
+        )
+        self.warmup(warmup_runs)
+
+    def warmup(self, runs=2):
+        dummy = np.zeros((1, *self.input_shape), dtype=np.float32)
+        for _ in range(runs):
+            self.predict_array(dummy)
+
+    def preprocess(self, frames):
+        return self.preprocessor(frames)
+
+    def _resize_input(self, batch_size):
+        if batch_size != self._batch_size:
+            self.interpreter.resize_tensor_input(
+                self._input_index, [batch_size, *self.input_shape]
+            )
+            self.interpreter.allocate_tensors()
+            self._batch_size = batch_size
+
+    def _quantize(self, batch):
+        if self._input_dtype == np.float32:
+            return batch
+        scale, zero_point = self._input_quant
+        info = np.iinfo(self._input_dtype)
+        quantized = np.round(batch / scale + zero_point)
+        return np.clip(quantized, info.min, info.max).astype(self._input_dtype)
+
+    def _dequantize(self, output):
+        if output.dtype == np.float32:
+            return output
+        scale, zero_point = self._output_quant
+        return (output.astype(np.float32) - zero_point) * scale
+
+    def predict_array(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        self._resize_input(len(batch))
+        self.interpreter.set_tensor(self._input_index, self._quantize(batch))
+        self.interpreter.invoke()
+        return self._dequantize(self.interpreter.get_tensor(self._output_index))
+
+    def predict_one(self, frame):
+        return self.predict_array(self.preprocess([frame]))[0]
+
+    def predict_batch(self, frames):
+        if len(frames) == 0:
+            return np.empty((0, self.num_classes), dtype=np.float32)
+        return self.predict_array(self.preprocess(frames))
+
+
+def find_tflite_model(model_filename, preference=TFLITE_PREFERENCE):
+    for quantization in preference:
+        filename = tflite_filename(model_filename, quantization)
+        if os.path.exists(os.path.join(MODELS_FOLDER, filename)):
+            return filename
+    return None
+
+
+def load_session(model_filename, backend="auto", num_threads=None):
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconhecido: {backend}")
+
+    if backend in ("auto", "tflite"):
+        tflite_model = find_tflite_model(model_filename)
+        if tflite_model:
+            print(f"[INFO] Usando backend TFLite: {tflite_model}")
+            return TFLiteSession(
+                os.path.join(MODELS_FOLDER, tflite_model), num_threads=num_threads
+            )
+        if backend == "tflite":
+            raise FileNotFoundError(
+                f"Nenhum modelo TFLite exportado para '{model_filename}'."
+            )
+
+    print(f"[INFO] Usando backend Keras: {model_filename}")
+    return InferenceSession(model_filename)
+
+
+class ActiveModel:
+    def __init__(self, model_filename, backend="auto", num_threads=None):
+        self.backend = backend
+        self.num_threads = num_threads
+        self._lock = threading.Lock()
+        self._current = self._load(model_filename)
+
+    def _load(self, model_filename):
+        labels = load_labels(model_filename)
+        session = load_session(model_filename, self.backend, self.num_threads)
+        return session, labels, model_filename
+
+    def get(self):
+        with self._lock:
+            return self._current
+
+    @property
+    def model_filename(self):
+        return self.get()[2]
+
+    def swap(self, model_filename):
+        loaded = self._load(model_filename)
+        with self._lock:
+            self._current = loaded
+        return loaded
+
+    def infer(self, frame):
+        session, labels, _ = self.get()
+        return session.predict_one(frame), labels
+
+    def infer_batch(self, frames):
+        session, labels, _ = self.get()
+        return session.predict_batch(frames), labels
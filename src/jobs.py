@@ -0,0 +1,145 @@
+import sys
+import json
+from collections import deque
+from PyQt5.QtCore import QObject, QProcess, QProcessEnvironment, QTimer, pyqtSignal
+from shared import PROGRESS_PREFIX
+
+KILL_TIMEOUT_MS = 3000
+
+
+class Job:
+    def __init__(self, name, args, group, stdin_data=None, on_finished=None, env=None):
+        self.name = name
+        self.args = args
+        self.group = group
+        self.stdin_data = stdin_data
+        self.env = env or {}
+        self.on_finished = on_finished
+        self.process = None
+        self.cancelled = False
+        self._buffer = ""
+
+
+class JobManager(QObject):
+    started = pyqtSignal(str)
+    output = pyqtSignal(str, str)
+    progress = pyqtSignal(str, dict)
+    finished = pyqtSignal(str, bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.queues = {}
+        self.running = {}
+
+    def submit(self, name, args, group, stdin_data=None, on_finished=None, env=None):
+        job = Job(name, args, group, stdin_data, on_finished, env)
+        self.queues.setdefault(group, deque()).append(job)
+        if group in self.running:
+            self.output.emit(name, f"[INFO] '{name}' aguardando na fila ({group}).")
+        self._start_next(group)
+        return job
+
+    def is_busy(self, group):
+        return group in self.running or bool(self.queues.get(group))
+
+    def cancel(self, job):
+        job.cancelled = True
+        queue = self.queues.get(job.group)
+        if queue and job in queue:
+            queue.remove(job)
+            self.finished.emit(job.name, False)
+            if job.on_finished is not None:
+                job.on_finished(False, True)
+            return
+
+        if job.process is None or job.process.state() == QProcess.NotRunning:
+            return
+        self.output.emit(job.name, f"[INFO] Cancelando '{job.name}'...")
+        job.process.terminate()
+        QTimer.singleShot(KILL_TIMEOUT_MS, lambda: self._kill(job))
+
+    def cancel_all(self):
+        for queue in self.queues.values():
+            queue.clear()
+        for job in list(self.running.values()):
+            self.cancel(job)
+
+    def _kill(self, job):
+        if job.process is not None and job.process.state() != QProcess.NotRunning:
+            job.process.kill()
+
+    def _start_next(self, group):
+        queue = self.queues.get(group)
+        if group in self.running or not queue:
+            return
+
+        job = queue.popleft()
+        self.running[group] = job
+
+        process = QProcess(self)
+        env = QProcessEnvironment.systemEnvironment()
+        env.insert("PYTHONUNBUFFERED", "1")
+        for key, value in job.env.items():
+            env.insert(key, value)
+        process.setProcessEnvironment(env)
+        process.setProcessChannelMode(QProcess.MergedChannels)
+        process.readyReadStandardOutput.connect(lambda: self._read_output(job))
+        process.finished.connect(
+            lambda exit_code, exit_status: self._on_finished(
+                job, exit_code, exit_status
+            )
+        )
+        process.errorOccurred.connect(lambda error: self._on_error(job, error))
+        job.process = process
+
+        process.start(sys.executable, job.args)
+        if job.stdin_data is not None:
+            process.write(job.stdin_data.encode())
+            process.closeWriteChannel()
+        self.started.emit(job.name)
+
+    def _read_output(self, job):
+        data = bytes(job.process.readAllStandardOutput()).decode(errors="replace")
+        job._buffer += data.replace("\r", "\n")
+        *lines, job._buffer = job._buffer.split("\n")
+        for line in lines:
+            self._handle_line(job, line)
+
+    def _handle_line(self, job, line):
+        if line.startswith(PROGRESS_PREFIX):
+            try:
+                self.progress.emit(
+                    job.name, json.loads(line[len(PROGRESS_PREFIX) :].strip())
+                )
+                return
+            except ValueError:
+                pass
+        if line.strip():
+            self.output.emit(job.name, line)
+
+    def _on_error(self, job, error):
+        if error == QProcess.FailedToStart:
+            self.output.emit(
+                job.name, f"[ERRO] Não foi possível iniciar '{job.name}'."
+            )
+            self._finish(job, False)
+
+    def _on_finished(self, job, exit_code, exit_status):
+        if job._buffer:
+            self._handle_line(job, job._buffer)
+            job._buffer = ""
+        success = (
+            exit_status == QProcess.NormalExit and exit_code == 0 and not job.cancelled
+        )
+        self._finish(job, success)
+
+    def _finish(self, job, success):
+        if self.running.get(job.group) is not job:
+            return
+        del self.running[job.group]
+        job.process.deleteLater()
+
+        self.finished.emit(job.name, success)
+        if job.on_finished is not None:
+            job.on_finished(success, job.cancelled)
+        self._start_next(job.group)
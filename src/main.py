@@ -1,7 +1,7 @@
 import sys
 import os
 import shutil
-import subprocess
+import secrets
 from PyQt5.QtWidgets import (
     QApplication,
     QWidget,
@@ -13,12 +13,18 @@ from PyQt5.QtWidgets import (
     QMessageBox,
     QInputDialog,
     QDialog,
+    QPlainTextEdit,
+    QProgressBar,
 )
 from PyQt5.QtGui import QColor, QPalette
 from PyQt5.QtCore import Qt
 import qtawesome as qta
-from predict import get_latest_model
-from shared import PROCESSED_DATA_DIR, CAPTURES_DIR
+from jobs import JobManager
+from registry import current_model
+from service_client import ServiceUnavailable, send_command
+from shared import PROCESSED_DATA_DIR, CAPTURES_DIR, SERVICE_AUTHKEY_ENV
+
+LOG_MAX_LINES = 500
 
 
 def get_registered_items():
@@ -35,7 +41,7 @@ class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Gerenciador de Itens")
-        self.setGeometry(100, 100, 400, 550)
+        self.setGeometry(100, 100, 400, 700)
 
         palette = self.palette()
         palette.setColor(QPalette.Window, QColor("#f0f4f8"))
@@ -164,9 +170,58 @@ class MainWindow(QWidget):
         self.arduino_button.clicked.connect(self.start_arduino)
         self.layout.addWidget(self.arduino_button)
 
+        self.log_view = QPlainTextEdit()
+        self.log_view.setReadOnly(True)
+        self.log_view.setMaximumBlockCount(LOG_MAX_LINES)
+        self.log_view.setFixedHeight(140)
+        self.log_view.setStyleSheet(
+            "background: #fff; color: #22223b; border: 1px solid #c9ada7; border-radius: 6px; font-size: 11px;"
+        )
+        self.layout.addWidget(self.log_view)
+
+        self.jobs = JobManager(self)
+        self.jobs.started.connect(
+            lambda name: self.append_log(name, f"[INFO] '{name}' iniciado.")
+        )
+        self.jobs.output.connect(self.append_log)
+        self.jobs.progress.connect(self.update_progress)
+
+        self.service_key = secrets.token_hex(16)
+        self.jobs.submit(
+            "serviço",
+            ["src/detection_service.py"],
+            "servico",
+            env={SERVICE_AUTHKEY_ENV: self.service_key},
+        )
+
         self.setLayout(self.layout)
         self.populate_list()
 
+    def send_to_service(self, command, **fields):
+        try:
+            return send_command(self.service_key.encode(), command, **fields)
+        except ServiceUnavailable:
+            return None
+
+    def start_in_service(self, mode, **fields):
+        reply = self.send_to_service("start", mode=mode, **fields)
+        if reply is None:
+            return False
+        if not reply.get("ok"):
+            QMessageBox.warning(self, "Detecção", reply.get("error", "Erro."))
+        return True
+
+    def notify_new_model(self):
+        self.send_to_service("swap_model", model=current_model())
+
+    def append_log(self, name, line):
+        self.log_view.appendPlainText(f"[{name}] {line}")
+
+    def closeEvent(self, event):
+        self.send_to_service("shutdown")
+        self.jobs.cancel_all()
+        event.accept()
+
     def start_arduino(self):
         items = get_registered_items()
         if not items:
@@ -208,6 +263,9 @@ class MainWindow(QWidget):
         if not ok or not port:
             return
 
+        if self.start_in_service("arduino", port_map=port_map, serial_port=port):
+            return
+
         try:
             import json
             import tempfile
@@ -218,18 +276,21 @@ class MainWindow(QWidget):
                 json.dump(port_map, temp_file)
                 temp_file_path = temp_file.name
 
-            subprocess.run(
+            self.jobs.submit(
+                "arduino",
                 [
-                    sys.executable,
                     "src/arduino.py",
                     "--model",
-                    get_latest_model(),
+                    current_model(),
                     "--map",
                     temp_file_path,
                     "--port",
                     port,
                 ],
-                check=True,
+                "deteccao",
+                on_finished=lambda success, cancelled: self.on_detection_finished(
+                    success, cancelled, "Erro ao iniciar o Arduino."
+                ),
             )
         except Exception as e:
             QMessageBox.critical(self, "Erro", f"Erro ao iniciar: {str(e)}")
@@ -267,22 +328,75 @@ class MainWindow(QWidget):
                 QMessageBox.critical(
                     self, "Erro", f"Erro ao remover '{item}': {str(e)}"
                 )
+                return
+
+            self.update_model_incrementally("remove", item)
 
     def add_new_item(self):
         text, ok = QInputDialog.getText(self, "Novo item", "Nome do novo item:")
         if ok and text:
-            try:
-                subprocess.run([sys.executable, "src/capture.py", text], check=True)
+            stdin_data = None
+            if os.path.exists(os.path.join(CAPTURES_DIR, text)):
+                replace = QMessageBox.question(
+                    self,
+                    "Item existente",
+                    f"Já existem imagens para '{text}'. Deseja substituí-las?",
+                    QMessageBox.Yes | QMessageBox.No,
+                )
+                if replace != QMessageBox.Yes:
+                    return
+                stdin_data = "s\n"
+
+            self.jobs.submit(
+                f"captura {text}",
+                ["src/capture.py", text],
+                "captura",
+                stdin_data,
+                on_finished=lambda success, cancelled: self.on_capture_finished(
+                    text, success
+                ),
+            )
+
+    def on_capture_finished(self, text, success):
+        if not success:
+            QMessageBox.critical(self, "Erro", "Erro ao capturar imagens.")
+            return
+
+        QMessageBox.information(
+            self, "Captura finalizada", f"Captura para '{text}' concluída."
+        )
+        self.populate_list()
+        self.update_model_incrementally("add", text)
+
+    def update_model_incrementally(self, action, item):
+        if not current_model():
+            return
+
+        def on_finished(success, cancelled):
+            if success:
+                self.notify_new_model()
                 QMessageBox.information(
-                    self, "Captura finalizada", f"Captura para '{text}' concluída."
+                    self, "Modelo atualizado", f"Modelo atualizado para '{item}'."
                 )
                 self.populate_list()
-            except subprocess.CalledProcessError:
-                QMessageBox.critical(self, "Erro", "Erro ao capturar imagens.")
+            elif not cancelled:
+                QMessageBox.warning(
+                    self,
+                    "Modelo não atualizado",
+                    "Não foi possível atualizar o modelo sem retreinar. "
+                    "Use 'Treinar novo modelo'.",
+                )
+
+        self.jobs.submit(
+            f"atualizar modelo ({item})",
+            ["src/incremental.py", action, item],
+            "treino",
+            on_finished=on_finished,
+        )
 
     def show_training_modal(self):
         self.training_dialog = QDialog(self)
-        self.training_dialog.setModal(True)
+        self.training_dialog.setModal(False)
         self.training_dialog.setWindowTitle("Treinando modelo")
         self.training_dialog.setWindowFlags(
             self.training_dialog.windowFlags() & ~Qt.WindowContextHelpButtonHint
@@ -292,9 +406,23 @@ class MainWindow(QWidget):
         label.setAlignment(Qt.AlignCenter)
         label.setStyleSheet("font-size: 16px; color: #4a4e69; font-weight: bold;")
         layout.addWidget(label)
+
+        self.training_progress = QProgressBar()
+        self.training_progress.setRange(0, 0)
+        layout.addWidget(self.training_progress)
+
+        self.training_status = QLabel("Preparando dados...")
+        self.training_status.setAlignment(Qt.AlignCenter)
+        self.training_status.setStyleSheet("font-size: 12px; color: #22223b;")
+        layout.addWidget(self.training_status)
+
+        cancel_button = QPushButton("Cancelar")
+        cancel_button.clicked.connect(lambda: self.jobs.cancel(self.training_job))
+        layout.addWidget(cancel_button)
+
         self.training_dialog.setLayout(layout)
         self.training_dialog.setStyleSheet("background: #fff; border-radius: 12px;")
-        self.training_dialog.resize(320, 100)
+        self.training_dialog.resize(360, 160)
         self.training_dialog.show()
 
     def hide_training_modal(self):
@@ -302,23 +430,70 @@ class MainWindow(QWidget):
             self.training_dialog.accept()
             del self.training_dialog
 
+    def update_progress(self, name, data):
+        if name != "treino" or not hasattr(self, "training_dialog"):
+            return
+
+        epochs = data.get("epochs") or 1
+        steps = data.get("steps")
+        if not steps:
+            # sem o total de passos, a barra só avança no fim de cada época
+            if not data.get("done"):
+                return
+            steps = 1
+        step = steps if data.get("done") else data.get("step", 0)
+        done = (data["epoch"] - 1) * steps + step
+        self.training_progress.setRange(0, epochs * steps)
+        self.training_progress.setValue(done)
+
+        status = f"Época {data['epoch']}/{epochs} | loss {data.get('loss', 0):.4f}"
+        if "val_loss" in data:
+            status += f" | val_loss {data['val_loss']:.4f}"
+        status += f" | {data.get('samples_per_sec', 0):.0f} amostras/s"
+        self.training_status.setText(status)
+
     def train_model(self):
+        if self.jobs.is_busy("treino"):
+            QMessageBox.information(
+                self, "Treinamento", "Já existe um treinamento em andamento."
+            )
+            return
+
+        self.training_job = self.jobs.submit(
+            "treino",
+            ["src/train_model.py"],
+            "treino",
+            on_finished=self.on_training_finished,
+        )
         self.show_training_modal()
-        QApplication.processEvents()
-        try:
-            subprocess.run([sys.executable, "src/train_model.py"], check=True)
+
+    def on_training_finished(self, success, cancelled):
+        self.hide_training_modal()
+        if success:
+            self.notify_new_model()
             QMessageBox.information(self, "Treinamento", "Modelo treinado com sucesso!")
             self.populate_list()
-        except subprocess.CalledProcessError:
+        elif cancelled:
+            QMessageBox.information(self, "Treinamento", "Treinamento cancelado.")
+        else:
             QMessageBox.critical(self, "Erro", "Erro ao treinar o modelo.")
-        finally:
-            self.hide_training_modal()
 
     def start_detection(self):
-        try:
-            subprocess.run([sys.executable, "src/predict.py"], check=True)
-        except subprocess.CalledProcessError:
-            QMessageBox.critical(self, "Erro", "Erro ao iniciar a detecção.")
+        if self.start_in_service("predict"):
+            return
+
+        self.jobs.submit(
+            "detecção",
+            ["src/predict.py"],
+            "deteccao",
+            on_finished=lambda success, cancelled: self.on_detection_finished(
+                success, cancelled, "Erro ao iniciar a detecção."
+            ),
+        )
+
+    def on_detection_finished(self, success, cancelled, message):
+        if not success and not cancelled:
+            QMessageBox.critical(self, "Erro", message)
 
 
 def main():
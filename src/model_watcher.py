@@ -0,0 +1,58 @@
+import threading
+
+POLL_INTERVAL = 2.0
+
+
+class ModelWatcher:
+    def __init__(
+        self, active_model, find_latest, interval=POLL_INTERVAL, on_swap=None
+    ):
+        self.active_model = active_model
+        self.find_latest = find_latest
+        self.interval = interval
+        self.on_swap = on_swap
+        self.failed = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._loop, name="model-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    def check(self):
+        """Troca para o modelo indicado por find_latest, se ele mudou.
+
+        Pode ser chamado de outras threads além do laço de verificação; o lock
+        garante que o mesmo modelo não seja carregado duas vezes.
+        """
+        with self._lock:
+            latest = self.find_latest()
+            current = self.active_model.model_filename
+            # o registro só aponta para modelos já gravados por completo
+            if not latest or latest == current or latest in self.failed:
+                return False
+
+            print(f"[INFO] Novo modelo detectado: {latest}. Carregando...")
+            try:
+                _, labels, _ = self.active_model.swap(latest)
+            except Exception as e:
+                print(f"[ERRO] Falha ao carregar '{latest}': {e}")
+                self.failed.add(latest)
+                return False
+
+            print(f"[INFO] Modelo trocado para '{latest}' sem interromper a câmera.")
+            if self.on_swap is not None:
+                self.on_swap(labels)
+            return True
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.check()
@@ -1,99 +1,148 @@
-import os
-import cv2
+import math
 import numpy as np
+import tensorflow as tf
 from sklearn.model_selection import train_test_split
-from shared import PROCESSED_DATA_DIR, CAPTURES_DIR, IMG_SIZE
-import random
-
-
-def create_processed_folder_structure(labels):
-    for label in labels:
-        path = os.path.join(PROCESSED_DATA_DIR, label)
-        os.makedirs(path, exist_ok=True)
+from capture_cache import update_cache
+from shards import ShardedDataset, write_shards
+from shared import IMG_SIZE
+
+SEED = 42
+TEST_SIZE = 0.2
+VALIDATION_SIZE = 0.1
+ROTATION_DEGREES = 10
+AUGMENTATIONS_PER_IMAGE = 3
+
+
+def process_captures(max_workers=None):
+    print(f"[INFO] Atualizando cache de capturas ({IMG_SIZE}x{IMG_SIZE})...")
+    return update_cache(max_workers)
+
+
+def rotation_transform(degrees):
+    angle = math.radians(degrees)
+    cos, sin = math.cos(angle), math.sin(angle)
+    center = (IMG_SIZE - 1) / 2
+    return tf.constant(
+        [
+            [
+                cos,
+                -sin,
+                center - cos * center + sin * center,
+                sin,
+                cos,
+                center - sin * center - cos * center,
+                0.0,
+                0.0,
+            ]
+        ],
+        dtype=tf.float32,
+    )
 
 
 def apply_augmentation(img):
-    augmented_images = []
-
-    augmented_images.append(img.copy())
-    augmented_images.append(cv2.flip(img, 1))
-
-    h, w = img.shape[:2]
-    M = cv2.getRotationMatrix2D((w / 2, h / 2), 10, 1)
-    img_rotated = cv2.warpAffine(img, M, (w, h), borderMode=cv2.BORDER_REFLECT)
-    augmented_images.append(img_rotated)
-
-    return augmented_images
-
-
-def load_and_process_images():
-    X = []
-    y = []
-    labels = [
-        d
-        for d in os.listdir(CAPTURES_DIR)
-        if os.path.isdir(os.path.join(CAPTURES_DIR, d))
-    ]
-
-    create_processed_folder_structure(labels)
-
-    print(f"[INFO] Processando imagens com augmentation...")
-
-    for label in labels:
-        class_path = os.path.join(CAPTURES_DIR, label)
-        save_path = os.path.join(PROCESSED_DATA_DIR, label)
-
-        image_count = 0
-        for file in os.listdir(class_path):
-            img_path = os.path.join(class_path, file)
-            img = cv2.imread(img_path)
-            if img is None:
-                continue
+    img = tf.cast(img, tf.float32)
+    img_rotated = tf.raw_ops.ImageProjectiveTransformV3(
+        images=img[tf.newaxis],
+        transforms=rotation_transform(ROTATION_DEGREES),
+        output_shape=[IMG_SIZE, IMG_SIZE],
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="REFLECT",
+    )[0]
+    return tf.stack([img, tf.image.flip_left_right(img), img_rotated])
+
+
+def to_model_input(img):
+    # a normalização fica dentro do modelo (Rescaling); aqui só muda o tipo
+    return tf.cast(img, tf.float32)
+
+
+def build_dataset(store, indices, num_classes, batch_size, training=False):
+    def read_sample(i):
+        return store.image(i), store.label_indices[i]
+
+    ds = tf.data.Dataset.from_tensor_slices(np.asarray(indices, dtype=np.int64))
+    if training:
+        ds = ds.shuffle(len(indices), seed=SEED, reshuffle_each_iteration=True)
+
+    def load(i):
+        img, label = tf.numpy_function(read_sample, [i], [tf.uint8, tf.int32])
+        img.set_shape((IMG_SIZE, IMG_SIZE, 3))
+        return img, tf.one_hot(label, num_classes)
+
+    ds = ds.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+
+    if training:
+        ds = ds.map(
+            lambda img, label: (
+                apply_augmentation(img),
+                tf.repeat(label[tf.newaxis], AUGMENTATIONS_PER_IMAGE, axis=0),
+            ),
+            num_parallel_calls=tf.data.AUTOTUNE,
+            deterministic=False,
+        )
+        ds = ds.unbatch()
+        ds = ds.shuffle(batch_size * 8, seed=SEED)
 
-            img_resized = cv2.resize(img, (IMG_SIZE, IMG_SIZE))
+    ds = ds.map(
+        lambda img, label: (to_model_input(img), label),
+        num_parallel_calls=tf.data.AUTOTUNE,
+    )
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
 
-            processed_img_path = os.path.join(save_path, file)
-            cv2.imwrite(processed_img_path, img_resized)
 
-            augmented_images = apply_augmentation(img_resized)
+def split_dataset(indices, y):
+    train_idx, test_idx, y_train, y_test = train_test_split(
+        indices, y, test_size=TEST_SIZE, random_state=SEED, stratify=y
+    )
+    train_idx, val_idx, y_train, y_val = train_test_split(
+        train_idx,
+        y_train,
+        test_size=VALIDATION_SIZE,
+        random_state=SEED,
+        stratify=y_train,
+    )
+    return train_idx, val_idx, test_idx
 
-            for aug_img in augmented_images:
-                img_normalized = aug_img / 255.0
-                X.append(img_normalized)
-                y.append(label)
 
-            image_count += 1
+def load_shards():
+    paths, y, label_names = process_captures()
+    write_shards(paths, y, label_names)
+    return ShardedDataset()
 
-        print(
-            f"[INFO] Classe '{label}': {image_count} imagens → {image_count * len(augmented_images)} após augmentação"
-        )
 
-    return np.array(X), np.array(y), labels
+def load_splits():
+    print("[INFO] Carregando e processando imagens...")
+    store = load_shards()
 
+    print("[INFO] Dividindo dataset...")
+    return store, split_dataset(np.arange(len(store)), store.label_indices)
 
-def encode_labels(y, label_names):
-    label_to_index = {name: i for i, name in enumerate(label_names)}
-    encoded = np.array([label_to_index[label] for label in y])
-    one_hot = np.eye(len(label_names))[encoded]
-    return one_hot
 
+def build_datasets(store, splits, batch_size):
+    num_classes = len(store.labels)
+    return tuple(
+        build_dataset(store, split, num_classes, batch_size, training=(i == 0))
+        for i, split in enumerate(splits)
+    )
 
-def preprocess():
-    print("[INFO] Carregando e processando imagens...")
-    X, y, label_names = load_and_process_images()
 
-    print("[INFO] Codificando rótulos...")
-    y_encoded = encode_labels(y, label_names)
+def preprocess(batch_size=16, loaded=None):
+    store, splits = loaded or load_splits()
+    label_names = store.labels
 
-    print("[INFO] Dividindo dataset...")
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y_encoded, test_size=0.2, random_state=42, stratify=y
-    )
+    print("[INFO] Montando pipeline de entrada (tf.data)...")
+    train_ds, val_ds, test_ds = build_datasets(store, splits, batch_size)
+    counts = {
+        "train": len(splits[0]) * AUGMENTATIONS_PER_IMAGE,
+        "val": len(splits[1]),
+        "test": len(splits[2]),
+    }
 
-    print(f"[INFO] Total de imagens processadas: {len(X)}")
+    print(f"[INFO] Total de imagens processadas: {len(store)}")
     print(f"[INFO] Labels: {label_names}")
-    return X_train, X_test, y_train, y_test, label_names
+    return train_ds, val_ds, test_ds, label_names, counts
 
 
 if __name__ == "__main__":
-    preprocess()
+    load_shards()
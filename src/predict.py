@@ -1,61 +1,16 @@
 import cv2
-import numpy as np
-import tensorflow as tf
 import sys
 import os
-import json
-from collections import deque
-from shared import IMG_SIZE, MODEL_PREFIX, MODEL_EXT, MODELS_FOLDER
-
-CONFIDENCE_THRESHOLD = 0.70
-BUFFER_SIZE = 10
-STABLE_FRAMES_REQUIRED = 5
-
-
-class PredictionBuffer:
-    def __init__(self, buffer_size=BUFFER_SIZE, stable_frames=STABLE_FRAMES_REQUIRED):
-        self.buffer = deque(maxlen=buffer_size)
-        self.stable_frames = stable_frames
-        self.current_label = None
-        self.stable_count = 0
-
-    def add_prediction(self, prediction):
-        self.buffer.append(prediction)
-
-    def get_smoothed_prediction(self):
-        if len(self.buffer) == 0:
-            return None
-        return np.mean(self.buffer, axis=0)
-
-    def get_stable_label(self, current_label):
-        if current_label == self.current_label:
-            self.stable_count += 1
-        else:
-            self.stable_count = 1
-            if self.stable_count >= self.stable_frames:
-                self.current_label = current_label
-
-        return (
-            self.current_label
-            if self.stable_count >= self.stable_frames
-            else self.current_label
-        )
-
-
-def load_labels_from_model(model_filename):
-    label_file = model_filename.replace(MODEL_EXT, ".labels.json")
-    label_path = os.path.join(MODELS_FOLDER, label_file)
-    if not os.path.exists(label_path):
-        print(f"[ERRO] Arquivo de labels '{label_file}' não encontrado.")
-        sys.exit(1)
-    with open(label_path, "r") as f:
-        return json.load(f)
+import argparse
+from engine import DetectionPipeline
+from inference import BACKENDS, ActiveModel
+from model_watcher import ModelWatcher
+from registry import current_model
+from scheduler import add_scheduler_arguments, scheduler_from_args
+from stabilizer import PredictionStabilizer
+from shared import MODELS_FOLDER
 
-
-def preprocess_frame(frame):
-    frame_resized = cv2.resize(frame, (IMG_SIZE, IMG_SIZE))
-    frame_normalized = frame_resized / 255.0
-    return np.expand_dims(frame_normalized, axis=0)
+WINDOW_NAME = "Reconhecimento em tempo real"
 
 
 def draw_label_with_background(
@@ -79,71 +34,137 @@ def draw_label_with_background(
     cv2.putText(frame, text, (x, y), font, font_scale, text_color, thickness)
 
 
-def main(model_filename):
-    labels = load_labels_from_model(model_filename)
-    model_path = os.path.join(MODELS_FOLDER, model_filename)
+def parse_source(spec):
+    # "0", "1"... são índices de câmera; o resto é arquivo de vídeo ou URL
+    spec = str(spec)
+    return int(spec) if spec.isdigit() else spec
 
-    if not os.path.exists(model_path):
-        print(f"[ERRO] Modelo '{model_path}' não encontrado.")
-        sys.exit(1)
 
-    print(f"[INFO] Carregando modelo '{model_path}'...")
-    model = tf.keras.models.load_model(model_path)
+def open_sources(specs):
+    return [cv2.VideoCapture(parse_source(spec)) for spec in specs]
 
-    cap = cv2.VideoCapture(0)
-    print("[INFO] Pressione 'q' ou clique no botão de fechar da janela para sair.")
 
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            print("[ERRO] Não foi possível acessar a câmera.")
-            break
+def window_name(index, count):
+    if count == 1:
+        return WINDOW_NAME
+    return f"{WINDOW_NAME} [{index}]"
 
-        input_data = preprocess_frame(frame)
-        prediction = model.predict(input_data, verbose=0)[0]
 
-        top_indices = prediction.argsort()[-3:][::-1]
+def run(active_model, captures, stop_event=None, headless=False, scheduler=None):
+    stabilizers = [PredictionStabilizer() for _ in captures]
+    outputs = [None] * len(captures)
+
+    def show(index, frame, result, fresh):
+        prediction, labels = result
+        # resultado reaproveitado não conta de novo na suavização
+        if fresh or outputs[index] is None:
+            outputs[index] = stabilizers[index].update(prediction, labels)
+        stable_label, smoothed = outputs[index]
+        top_indices = smoothed.argsort()[-3:][::-1]
 
         for i, idx in enumerate(top_indices):
             label = labels[idx]
-            confidence = prediction[idx]
+            confidence = smoothed[idx]
             text = f"{label}: {confidence * 100:.1f}%"
             draw_label_with_background(
                 frame, text, (30, 60 + i * 50), cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2
             )
+        draw_label_with_background(
+            frame,
+            f"Item: {stable_label or '-'}",
+            (30, 60 + len(top_indices) * 50),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            1.0,
+            2,
+            bg_color=(0, 120, 0),
+        )
+
+        if headless:
+            return
 
-        cv2.imshow("Reconhecimento em tempo real", frame)
+        window = window_name(index, len(captures))
+        cv2.imshow(window, frame)
 
-        if (
-            cv2.getWindowProperty("Reconhecimento em tempo real", cv2.WND_PROP_VISIBLE)
-            < 1
-        ):
-            break
+        if cv2.getWindowProperty(window, cv2.WND_PROP_VISIBLE) < 1:
+            return False
 
         if cv2.waitKey(1) & 0xFF == ord("q"):
-            break
+            return False
+
+    pipeline = DetectionPipeline(
+        captures,
+        active_model.infer_batch,
+        stop_event=stop_event,
+        drop_frames=not headless,
+        scheduler=scheduler,
+    )
+    try:
+        pipeline.run(show)
+    finally:
+        if not headless:
+            cv2.destroyAllWindows()
+
+    if not headless:
+        for index in sorted(pipeline.failed_sources):
+            print(f"[ERRO] Não foi possível ler a fonte {index} (câmera ou vídeo).")
+    return pipeline
+
+
+def main(
+    model_filename,
+    backend="auto",
+    num_threads=None,
+    watch=True,
+    sources=("0",),
+    scheduler=None,
+):
+    model_path = os.path.join(MODELS_FOLDER, model_filename)
+
+    if not os.path.exists(model_path):
+        print(f"[ERRO] Modelo '{model_path}' não encontrado.")
+        sys.exit(1)
 
-    cap.release()
-    cv2.destroyAllWindows()
+    print(f"[INFO] Carregando modelo '{model_path}'...")
+    try:
+        active_model = ActiveModel(model_filename, backend, num_threads)
+    except FileNotFoundError as e:
+        print(f"[ERRO] {e}")
+        sys.exit(1)
 
+    watcher = ModelWatcher(active_model, current_model)
+    if watch:
+        watcher.start()
 
-def get_latest_model():
-    models = [
-        f
-        for f in os.listdir(MODELS_FOLDER)
-        if f.startswith(MODEL_PREFIX) and f.endswith(MODEL_EXT)
-    ]
-    if not models:
-        return None
-    models.sort(reverse=True)
-    return models[0]
+    captures = open_sources(sources)
+    print("[INFO] Pressione 'q' ou clique no botão de fechar da janela para sair.")
+    try:
+        run(active_model, captures, scheduler=scheduler)
+    finally:
+        watcher.stop()
 
 
 if __name__ == "__main__":
-    if len(sys.argv) >= 2:
-        model_filename = sys.argv[1]
-    else:
-        model_filename = get_latest_model()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("model", nargs="?", default=None)
+    parser.add_argument("--backend", choices=BACKENDS, default="auto")
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument(
+        "--no-reload",
+        action="store_true",
+        help="Não troca automaticamente para modelos novos em models/.",
+    )
+    parser.add_argument(
+        "--source",
+        action="append",
+        default=None,
+        help="Índice de câmera, vídeo ou URL (pode repetir; padrão: câmera 0).",
+    )
+    add_scheduler_arguments(parser)
+    args = parser.parse_args()
+
+    model_filename = args.model
+    if not model_filename:
+        model_filename = current_model()
         if not model_filename:
             print("[ERRO] Nenhum modelo encontrado no diretório atual.")
             sys.exit(1)
@@ -151,4 +172,11 @@ if __name__ == "__main__":
             f"[INFO] Nenhum modelo informado. Usando o mais recente: {model_filename}"
         )
 
-    main(model_filename)
+    main(
+        model_filename,
+        args.backend,
+        args.threads,
+        not args.no_reload,
+        args.source or ["0"],
+        scheduler_from_args(args),
+    )
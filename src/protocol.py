@@ -0,0 +1,94 @@
+"""Protocolo binário entre o Python e o firmware do Arduino.
+
+Todo quadro tem 9 bytes:
+
+    0xA5 | versão | tipo | seq | payload (uint32, little-endian) | CRC-8
+
+O CRC-8 (polinômio 0x07) cobre do byte de versão ao fim do payload. Em
+SET_PINS o payload é uma máscara de bits em que o bit N acende o pino N
+(pinos 2 a 13). Em BAUD ele é a nova velocidade. As respostas ACK e NACK
+repetem o seq do quadro recebido; o ACK de SET_PINS devolve a máscara
+aplicada.
+"""
+
+import struct
+
+START_BYTE = 0xA5
+VERSION = 1
+FRAME_SIZE = 9
+
+READY = 0x01
+SET_PINS = 0x02
+BAUD = 0x03
+PING = 0x04
+ACK = 0x05
+NACK = 0x06
+
+FIRST_PIN = 2
+LAST_PIN = 13
+INITIAL_BAUDRATE = 9600
+FAST_BAUDRATE = 115200
+
+_BODY = struct.Struct("<BBBI")
+
+
+def crc8(data):
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def encode(frame_type, seq, payload=0):
+    body = _BODY.pack(VERSION, frame_type, seq & 0xFF, payload & 0xFFFFFFFF)
+    return bytes([START_BYTE]) + body + bytes([crc8(body)])
+
+
+def pins_to_mask(pins):
+    mask = 0
+    for pin in pins:
+        pin = int(pin)
+        if not FIRST_PIN <= pin <= LAST_PIN:
+            raise ValueError(f"Pino {pin} fora do intervalo {FIRST_PIN}-{LAST_PIN}.")
+        mask |= 1 << pin
+    return mask
+
+
+def mask_to_pins(mask):
+    return [pin for pin in range(FIRST_PIN, LAST_PIN + 1) if mask & (1 << pin)]
+
+
+class Decoder:
+    """Remonta quadros a partir de bytes soltos, ressincronizando no 0xA5."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.errors = 0
+
+    def feed(self, data):
+        self.buffer.extend(data)
+        frames = []
+        while True:
+            start = self.buffer.find(START_BYTE)
+            if start < 0:
+                self.buffer.clear()
+                return frames
+            del self.buffer[:start]
+            if len(self.buffer) < FRAME_SIZE:
+                return frames
+
+            body = bytes(self.buffer[1 : FRAME_SIZE - 1])
+            if crc8(body) != self.buffer[FRAME_SIZE - 1]:
+                # byte de início falso ou quadro corrompido: descarta só ele
+                self.errors += 1
+                del self.buffer[0]
+                continue
+
+            version, frame_type, seq, payload = _BODY.unpack(body)
+            del self.buffer[:FRAME_SIZE]
+            if version != VERSION:
+                self.errors += 1
+                continue
+            frames.append((frame_type, seq, payload))
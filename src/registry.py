@@ -0,0 +1,423 @@
+import os
+import sys
+import json
+import fcntl
+import hashlib
+import argparse
+import datetime
+import threading
+import contextlib
+from shared import (
+    IMG_SIZE,
+    INPUT_SCALE_LEGACY,
+    MODEL_EXT,
+    MODEL_PREFIX,
+    MODELS_FOLDER,
+    TFLITE_EXT,
+)
+
+REGISTRY_FILE = "registry.json"
+REGISTRY_VERSION = 1
+KEEP_MODELS = 5
+
+_cache = {"signature": None, "data": None, "files": None}
+_cache_lock = threading.Lock()
+
+
+def registry_path(models_folder=MODELS_FOLDER):
+    return os.path.join(models_folder, REGISTRY_FILE)
+
+
+@contextlib.contextmanager
+def registry_lock(models_folder=MODELS_FOLDER):
+    """Serializa quem altera o índice, entre threads e entre processos."""
+    os.makedirs(models_folder, exist_ok=True)
+    with open(registry_path(models_folder) + ".lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def labels_filename(model_filename):
+    return model_filename.replace(MODEL_EXT, ".labels.json")
+
+
+def load_labels(model_filename, models_folder=MODELS_FOLDER):
+    label_path = os.path.join(models_folder, labels_filename(model_filename))
+    if not os.path.exists(label_path):
+        raise FileNotFoundError(f"Arquivo de labels '{label_path}' não encontrado.")
+    with open(label_path, "r") as f:
+        return json.load(f)
+
+
+def model_files(model_filename, models_folder=MODELS_FOLDER):
+    stem = model_filename[: -len(MODEL_EXT)]
+    files = [model_filename, labels_filename(model_filename)]
+    for f in sorted(os.listdir(models_folder)):
+        if f.startswith(stem + ".") and f.endswith(TFLITE_EXT):
+            files.append(f)
+    return files
+
+
+def checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def describe_files(model_filename, models_folder=MODELS_FOLDER):
+    files = {}
+    for f in model_files(model_filename, models_folder):
+        path = os.path.join(models_folder, f)
+        files[f] = {"size": os.path.getsize(path), "sha256": checksum(path)}
+    return files
+
+
+def export_formats(files):
+    formats = []
+    for f in files:
+        if f.endswith(MODEL_EXT):
+            formats.append("keras")
+        elif f.endswith(TFLITE_EXT):
+            formats.append(f[: -len(TFLITE_EXT)].rsplit(".", 1)[-1])
+    return formats
+
+
+def empty_registry():
+    return {
+        "version": REGISTRY_VERSION,
+        "latest": None,
+        "latest_final": None,
+        "pinned": None,
+        "models": {},
+    }
+
+
+def newest_final(data):
+    finals = [e for e in data["models"].values() if not e.get("partial")]
+    if not finals:
+        return None
+    return max(finals, key=lambda e: e["version"])["model"]
+
+
+def upgrade(data):
+    # índices gravados antes de latest_final existir
+    if "latest_final" not in data:
+        data["latest_final"] = newest_final(data)
+    return data
+
+
+def write_registry(data, models_folder=MODELS_FOLDER):
+    os.makedirs(models_folder, exist_ok=True)
+    path = registry_path(models_folder)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def legacy_registry(models_folder=MODELS_FOLDER):
+    # modelos salvos antes do registro: só entram os que já têm labels
+    data = empty_registry()
+    if not os.path.isdir(models_folder):
+        return data
+
+    legacy = sorted(
+        f
+        for f in os.listdir(models_folder)
+        if f.startswith(MODEL_PREFIX)
+        and f.endswith(MODEL_EXT)
+        and os.path.exists(os.path.join(models_folder, labels_filename(f)))
+    )
+    if not legacy:
+        return data
+
+    print(f"[INFO] Registrando {len(legacy)} modelo(s) existente(s)...")
+    for model_filename in legacy:
+        with open(os.path.join(models_folder, labels_filename(model_filename))) as f:
+            labels = json.load(f)
+        add_entry(data, model_filename, labels, models_folder, source="legado")
+    return data
+
+
+def load_for_update(models_folder=MODELS_FOLDER):
+    # só com registry_lock: lê direto do disco uma cópia que pode ser alterada
+    path = registry_path(models_folder)
+    if not os.path.exists(path):
+        return legacy_registry(models_folder)
+    with open(path, "r") as f:
+        return upgrade(json.load(f))
+
+
+def migrate_legacy(models_folder=MODELS_FOLDER):
+    if not os.path.isdir(models_folder):
+        return empty_registry()
+    with registry_lock(models_folder):
+        # outro processo pode ter migrado enquanto este esperava o lock
+        exists = os.path.exists(registry_path(models_folder))
+        data = load_for_update(models_folder)
+        if data["models"] and not exists:
+            write_registry(data, models_folder)
+    return data
+
+
+def index_files(data):
+    return {f: entry for entry in data["models"].values() for f in entry["files"]}
+
+
+def read_registry(models_folder=MODELS_FOLDER):
+    path = registry_path(models_folder)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return migrate_legacy(models_folder)
+
+    # lido de novo apenas quando o arquivo muda
+    signature = (path, stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        if _cache["signature"] != signature:
+            with open(path, "r") as f:
+                _cache["data"] = upgrade(json.load(f))
+            _cache["files"] = index_files(_cache["data"])
+            _cache["signature"] = signature
+        return _cache["data"]
+
+
+def add_entry(data, model_filename, labels, models_folder, accuracy=None, **extra):
+    files = describe_files(model_filename, models_folder)
+    versions = [entry["version"] for entry in data["models"].values()]
+    data["models"][model_filename] = {
+        "version": max(versions, default=0) + 1,
+        "model": model_filename,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "labels": labels,
+        "accuracy": accuracy,
+        "img_size": IMG_SIZE,
+        "formats": export_formats(files),
+        "files": files,
+        **extra,
+    }
+    data["latest"] = model_filename
+    if not extra.get("partial"):
+        data["latest_final"] = model_filename
+    return data["models"][model_filename]
+
+
+def publish(
+    model_filename, labels, accuracy=None, models_folder=MODELS_FOLDER, **extra
+):
+    """Registra um modelo já gravado em disco e o torna o mais recente.
+
+    Os arquivos precisam estar completos antes da chamada: o índice só passa
+    a apontar para o modelo depois de escrito atomicamente.
+    """
+    with registry_lock(models_folder):
+        data = load_for_update(models_folder)
+        entry = add_entry(
+            data, model_filename, labels, models_folder, accuracy, **extra
+        )
+        write_registry(data, models_folder)
+    print(f"[INFO] Modelo publicado: {model_filename} (v{entry['version']})")
+    return entry
+
+
+def get_entry(model_filename, models_folder=MODELS_FOLDER):
+    return read_registry(models_folder)["models"].get(model_filename)
+
+
+def input_scale(model_filename, models_folder=MODELS_FOLDER):
+    """Fator aplicado aos pixels antes do modelo (também para os .tflite)."""
+    data = read_registry(models_folder)
+    with _cache_lock:
+        files = _cache["files"] if _cache["data"] is data else None
+    # o índice por arquivo inclui o .keras, os labels e cada .tflite
+    entry = (files or index_files(data)).get(os.path.basename(model_filename))
+    if entry is None:
+        return INPUT_SCALE_LEGACY
+    return entry.get("input_scale", INPUT_SCALE_LEGACY)
+
+
+def latest_model(models_folder=MODELS_FOLDER):
+    return read_registry(models_folder)["latest"]
+
+
+def pinned_model(models_folder=MODELS_FOLDER):
+    return read_registry(models_folder)["pinned"]
+
+
+def best_model(models_folder=MODELS_FOLDER):
+    return best_in(read_registry(models_folder))
+
+
+def best_in(data):
+    latest = data["models"].get(data["latest"])
+    if latest is None:
+        return None
+    # acurácias só são comparáveis entre modelos com os mesmos itens
+    candidates = [
+        entry
+        for entry in data["models"].values()
+        if entry["labels"] == latest["labels"] and entry["accuracy"] is not None
+    ]
+    if not candidates:
+        return latest["model"]
+    return max(candidates, key=lambda e: (e["accuracy"], e["version"]))["model"]
+
+
+def published_accuracy(labels, models_folder=MODELS_FOLDER):
+    """Maior acurácia entre os modelos finais (não parciais) com esses itens."""
+    scores = [
+        entry["accuracy"]
+        for entry in read_registry(models_folder)["models"].values()
+        if entry["labels"] == labels
+        and not entry.get("partial")
+        and entry["accuracy"] is not None
+    ]
+    return max(scores, default=None)
+
+
+def current_model(models_folder=MODELS_FOLDER, include_partial=False):
+    """Modelo que a detecção deve usar: o fixado, se houver, ou o mais recente.
+
+    Modelos parciais, publicados no meio de um treino, só são escolhidos com
+    include_partial (ou fixando-os com `pin`).
+    """
+    data = read_registry(models_folder)
+    if include_partial:
+        return data["pinned"] or data["latest"]
+    return data["pinned"] or data["latest_final"]
+
+
+def pin(model_filename, models_folder=MODELS_FOLDER):
+    with registry_lock(models_folder):
+        data = load_for_update(models_folder)
+        if model_filename is not None and model_filename not in data["models"]:
+            raise ValueError(f"Modelo '{model_filename}' não está no registro.")
+        data["pinned"] = model_filename
+        write_registry(data, models_folder)
+
+
+def verify(model_filename, models_folder=MODELS_FOLDER):
+    entry = get_entry(model_filename, models_folder)
+    if entry is None:
+        raise ValueError(f"Modelo '{model_filename}' não está no registro.")
+    corrupted = []
+    for f, info in entry["files"].items():
+        path = os.path.join(models_folder, f)
+        if not os.path.exists(path) or checksum(path) != info["sha256"]:
+            corrupted.append(f)
+    return corrupted
+
+
+def remove_files(entry, models_folder=MODELS_FOLDER):
+    for f in entry["files"]:
+        path = os.path.join(models_folder, f)
+        if os.path.exists(path):
+            os.remove(path)
+    print(f"[INFO] Modelo removido: {entry['model']}")
+
+
+def unpublish(model_filename, models_folder=MODELS_FOLDER):
+    """Tira um modelo do registro e apaga seus arquivos; o fixado é mantido."""
+    with registry_lock(models_folder):
+        data = load_for_update(models_folder)
+        entry = data["models"].get(model_filename)
+        if entry is None or model_filename == data["pinned"]:
+            return False
+
+        del data["models"][model_filename]
+        if data["latest_final"] == model_filename:
+            data["latest_final"] = newest_final(data)
+        if data["latest"] == model_filename:
+            # um parcial que sobrou não volta a ser o mais recente
+            data["latest"] = data["latest_final"]
+        write_registry(data, models_folder)
+    remove_files(entry, models_folder)
+    return True
+
+
+def collect_garbage(keep=KEEP_MODELS, models_folder=MODELS_FOLDER):
+    with registry_lock(models_folder):
+        data = load_for_update(models_folder)
+        entries = sorted(
+            data["models"].values(), key=lambda e: e["version"], reverse=True
+        )
+        protected = {data["latest"], data["latest_final"], data["pinned"]}
+        protected.add(best_in(data))
+        protected.update(entry["model"] for entry in entries[:keep])
+
+        removed = []
+        for entry in entries:
+            if entry["model"] in protected:
+                continue
+            del data["models"][entry["model"]]
+            removed.append(entry)
+
+        # o índice é atualizado antes de apagar, para nunca apontar para
+        # arquivos que não existem mais
+        write_registry(data, models_folder)
+    for entry in removed:
+        remove_files(entry, models_folder)
+    return [entry["model"] for entry in removed]
+
+
+def print_registry(models_folder=MODELS_FOLDER):
+    data = read_registry(models_folder)
+    for entry in sorted(data["models"].values(), key=lambda e: e["version"]):
+        flags = []
+        if entry["model"] == data["latest"]:
+            flags.append("mais recente")
+        if entry["model"] == data["pinned"]:
+            flags.append("fixado")
+        if entry.get("partial"):
+            flags.append(f"parcial, época {entry['epoch']}")
+        accuracy = "-" if entry["accuracy"] is None else f"{entry['accuracy']:.2%}"
+        size_kb = sum(info["size"] for info in entry["files"].values()) / 1024
+        print(
+            f"v{entry['version']:<4} {entry['model']:<32} acc={accuracy:<8} "
+            f"{size_kb:>8.0f} KB {','.join(entry['formats'])} "
+            f"{' '.join(f'[{flag}]' for flag in flags)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list")
+    pin_parser = subparsers.add_parser("pin")
+    pin_parser.add_argument("model")
+    subparsers.add_parser("unpin")
+    verify_parser = subparsers.add_parser("verify")
+    verify_parser.add_argument("model", nargs="?", default=None)
+    gc_parser = subparsers.add_parser("gc")
+    gc_parser.add_argument("--keep", type=int, default=KEEP_MODELS)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "list":
+            print_registry()
+        elif args.command == "pin":
+            pin(args.model)
+            print(f"[INFO] Detecção fixada em '{args.model}'.")
+        elif args.command == "unpin":
+            pin(None)
+            print("[INFO] Detecção volta a usar o modelo mais recente.")
+        elif args.command == "verify":
+            model_filename = args.model or current_model()
+            corrupted = verify(model_filename)
+            if corrupted:
+                print(f"[ERRO] Arquivos alterados ou ausentes: {corrupted}")
+                sys.exit(1)
+            print(f"[INFO] '{model_filename}' íntegro.")
+        else:
+            removed = collect_garbage(args.keep)
+            print(f"[INFO] {len(removed)} modelo(s) removido(s).")
+    except ValueError as e:
+        print(f"[ERRO] {e}")
+        sys.exit(1)
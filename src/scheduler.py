@@ -0,0 +1,121 @@
+import time
+import cv2
+import numpy as np
+
+MIN_RATE = 2.0
+MOTION_THRESHOLD = 6.0
+THUMBNAIL_SIZE = (32, 24)
+
+
+class InferenceScheduler:
+    """Decide, a cada ciclo, quais fontes realmente precisam de inferência.
+
+    A cena é comparada com o quadro da última inferência em uma miniatura
+    em tons de cinza (diferença absoluta média, escala 0-255). Sem mudança, o
+    último resultado é reaproveitado, com no mínimo min_rate inferências por
+    segundo por fonte. target_fps limita a taxa de inferência e cpu_budget a
+    fração de um núcleo gasta no modelo (0.5 = metade), para vários detectores
+    dividirem a mesma máquina.
+    """
+
+    def __init__(
+        self,
+        min_rate=MIN_RATE,
+        target_fps=None,
+        cpu_budget=None,
+        motion_threshold=MOTION_THRESHOLD,
+    ):
+        if cpu_budget is not None and not 0 < cpu_budget <= 1:
+            raise ValueError("cpu_budget deve estar entre 0 e 1.")
+        self.min_interval = 1.0 / min_rate if min_rate else float("inf")
+        self.target_interval = 1.0 / target_fps if target_fps else 0.0
+        self.cpu_budget = cpu_budget
+        self.motion_threshold = motion_threshold
+        self.inferred = 0
+        self.skipped = 0
+        self._references = {}
+        self._last_inference = {}
+        self._next_allowed = 0.0
+        self._gray = None
+        self._thumb = np.empty(THUMBNAIL_SIZE[::-1], dtype=np.uint8)
+
+    def _thumbnail(self, frame):
+        self._gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        return cv2.resize(
+            self._gray, THUMBNAIL_SIZE, dst=self._thumb, interpolation=cv2.INTER_AREA
+        ).copy()
+
+    def _changed(self, index, thumb):
+        reference = self._references.get(index)
+        if thumb is None or reference is None:
+            return True
+        return cv2.absdiff(thumb, reference).mean() > self.motion_threshold
+
+    def select(self, batch, now=None):
+        """Recebe [(fonte, quadro)] e devolve só os que devem ir ao modelo."""
+        now = time.perf_counter() if now is None else now
+        if now < self._next_allowed:
+            self.skipped += len(batch)
+            return []
+
+        selected = []
+        for index, frame in batch:
+            due = now - self._last_inference.get(index, -np.inf) >= self.min_interval
+            thumb = None if self.motion_threshold is None else self._thumbnail(frame)
+            if due or self._changed(index, thumb):
+                self._references[index] = thumb
+                self._last_inference[index] = now
+                selected.append((index, frame))
+            else:
+                self.skipped += 1
+        self.inferred += len(selected)
+        return selected
+
+    def record(self, started, duration):
+        """Agenda a próxima inferência conforme target_fps e cpu_budget."""
+        next_allowed = started + self.target_interval
+        if self.cpu_budget is not None:
+            idle = duration * (1.0 / self.cpu_budget - 1.0)
+            next_allowed = max(next_allowed, started + duration + idle)
+        self._next_allowed = next_allowed
+
+    def report(self):
+        total = self.inferred + self.skipped
+        saved = self.skipped / total if total else 0.0
+        return (
+            f"inferidos {self.inferred}, reaproveitados {self.skipped} ({saved:.0%})"
+        )
+
+
+def add_scheduler_arguments(parser):
+    group = parser.add_argument_group("agendamento da inferência")
+    group.add_argument(
+        "--always-infer",
+        action="store_true",
+        help="Roda o modelo em todo quadro, sem detecção de movimento.",
+    )
+    group.add_argument(
+        "--min-rate",
+        type=float,
+        default=MIN_RATE,
+        help="Inferências mínimas por segundo sem movimento.",
+    )
+    group.add_argument("--target-fps", type=float, default=None)
+    group.add_argument(
+        "--cpu-budget",
+        type=float,
+        default=None,
+        help="Fração de um núcleo para o modelo (ex: 0.5).",
+    )
+    group.add_argument("--motion-threshold", type=float, default=MOTION_THRESHOLD)
+
+
+def scheduler_from_args(args):
+    if args.always_infer and not (args.target_fps or args.cpu_budget):
+        return None
+    return InferenceScheduler(
+        args.min_rate,
+        args.target_fps,
+        args.cpu_budget,
+        None if args.always_infer else args.motion_threshold,
+    )
@@ -0,0 +1,200 @@
+import threading
+import time
+from collections import deque
+import serial
+import protocol
+from engine import LatestQueue
+
+READY_TIMEOUT = 4.0
+ACK_TIMEOUT = 0.2
+MAX_RETRIES = 3
+WRITE_TIMEOUT = 0.2
+MIN_BACKOFF = 0.5
+MAX_BACKOFF = 8.0
+
+
+class SerialLink:
+    """Envia comandos ao Arduino em uma thread própria.
+
+    Só o estado mais recente importa (quais LEDs acender), então a fila guarda
+    apenas a última máscara de pinos: quem chama nunca bloqueia, mesmo com a
+    porta lenta, travada ou desconectada.
+    """
+
+    def __init__(
+        self,
+        port,
+        baudrate=protocol.FAST_BAUDRATE,
+        ready_timeout=READY_TIMEOUT,
+        ack_timeout=ACK_TIMEOUT,
+    ):
+        self.port = port
+        self.baudrate = baudrate
+        self.ready_timeout = ready_timeout
+        self.ack_timeout = ack_timeout
+        self.commands = LatestQueue(1)
+        self.connected = threading.Event()
+        self.last_mask = None
+        self.sent = 0
+        self.acked = 0
+        self.reconnects = 0
+        self.latencies = deque(maxlen=1000)
+        self._seq = 0
+        self._ser = None
+        self._decoder = protocol.Decoder()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._loop, name="serial-link", daemon=True
+        )
+        self._thread.start()
+
+    def send_pins(self, pins):
+        self.commands.put(protocol.pins_to_mask(pins))
+
+    @property
+    def coalesced(self):
+        return self.commands.dropped
+
+    def wait_ready(self, timeout=None):
+        return self.connected.wait(timeout)
+
+    def close(self):
+        self._stop.set()
+        self.commands.close()
+        self._thread.join(timeout=2.0)
+        self._disconnect()
+        print(
+            f"[ARDUINO] Enviados: {self.sent}, confirmados: {self.acked}, "
+            f"descartados: {self.coalesced}, reconexões: {self.reconnects}"
+        )
+
+    def _next_seq(self):
+        self._seq = (self._seq + 1) & 0xFF
+        return self._seq
+
+    def _read_frames(self, ser):
+        waiting = ser.in_waiting
+        return self._decoder.feed(ser.read(waiting or 1))
+
+    def _wait_for(self, ser, frame_type, seq=None, timeout=None):
+        deadline = time.perf_counter() + (timeout or self.ack_timeout)
+        while time.perf_counter() < deadline and not self._stop.is_set():
+            for received_type, received_seq, payload in self._read_frames(ser):
+                if received_type == protocol.NACK and received_seq == seq:
+                    return None
+                if received_type == frame_type and seq in (None, received_seq):
+                    return payload
+        return None
+
+    def _request(self, ser, frame_type, payload=0):
+        seq = self._next_seq()
+        ser.write(protocol.encode(frame_type, seq, payload))
+        return self._wait_for(ser, protocol.ACK, seq)
+
+    def _negotiate(self, ser):
+        if self.baudrate == protocol.INITIAL_BAUDRATE:
+            return
+        if self._request(ser, protocol.BAUD, self.baudrate) is None:
+            print("[AVISO] Arduino recusou a troca de velocidade; mantendo 9600.")
+            return
+
+        ser.baudrate = self.baudrate
+        ser.reset_input_buffer()
+        self._decoder = protocol.Decoder()
+        if self._request(ser, protocol.PING) is None:
+            # a placa já trocou de velocidade e não volta sozinha; fechar e
+            # reabrir a porta a reinicia em 9600
+            ser.close()
+            raise serial.SerialException(f"sem resposta a {self.baudrate} baud")
+
+    def _open(self):
+        ser = serial.Serial(
+            self.port,
+            protocol.INITIAL_BAUDRATE,
+            timeout=0.05,
+            write_timeout=WRITE_TIMEOUT,
+        )
+        self._decoder = protocol.Decoder()
+        # abrir a porta reinicia a placa; espera o quadro READY do firmware
+        # em vez de um tempo fixo
+        if self._wait_for(ser, protocol.READY, timeout=self.ready_timeout) is not None:
+            self._negotiate(ser)
+            return ser
+
+        # placa que não reiniciou ao abrir a porta: pode ainda estar na
+        # velocidade negociada numa conexão anterior
+        for baudrate in dict.fromkeys([protocol.INITIAL_BAUDRATE, self.baudrate]):
+            ser.baudrate = baudrate
+            ser.reset_input_buffer()
+            if self._request(ser, protocol.PING) is not None:
+                if baudrate == protocol.INITIAL_BAUDRATE:
+                    self._negotiate(ser)
+                return ser
+        ser.close()
+        raise serial.SerialException("o Arduino não respondeu")
+
+    def _connect(self):
+        backoff = MIN_BACKOFF
+        while not self._stop.is_set():
+            try:
+                self._ser = self._open()
+                self.connected.set()
+                print(
+                    f"[ARDUINO] Conectado em {self.port} "
+                    f"a {self._ser.baudrate} baud."
+                )
+                return True
+            except (serial.SerialException, OSError) as e:
+                print(
+                    f"[AVISO] Porta {self.port} indisponível ({e}). "
+                    f"Nova tentativa em {backoff:.1f}s."
+                )
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+        return False
+
+    def _disconnect(self):
+        self.connected.clear()
+        if self._ser is not None:
+            try:
+                self._ser.close()
+            except (serial.SerialException, OSError):
+                pass
+            self._ser = None
+
+    def _deliver(self, mask):
+        for _ in range(MAX_RETRIES):
+            started = time.perf_counter()
+            self.sent += 1
+            if self._request(self._ser, protocol.SET_PINS, mask) == mask:
+                self.acked += 1
+                self.latencies.append(time.perf_counter() - started)
+                return
+            if self.commands.depth():
+                # já existe um estado mais novo; não vale insistir neste
+                return
+        # sem nenhuma confirmação o enlace está perdido: _loop reconecta e
+        # reenvia o último estado
+        pins = protocol.mask_to_pins(mask)
+        raise serial.SerialException(f"o Arduino não confirmou os pinos {pins}")
+
+    def _loop(self):
+        if not self._connect():
+            return
+
+        while not self._stop.is_set():
+            mask = self.commands.get(timeout=0.5)
+            if mask is None:
+                continue
+            self.last_mask = mask
+            try:
+                self._deliver(mask)
+            except (serial.SerialException, OSError) as e:
+                print(f"[AVISO] Conexão serial perdida: {e}. Reconectando...")
+                self._disconnect()
+                self.reconnects += 1
+                if not self._connect():
+                    return
+                # reenvia o último estado pedido, se nada mais novo chegou
+                if not self.commands.depth():
+                    self.commands.put(self.last_mask)
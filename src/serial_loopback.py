@@ -0,0 +1,226 @@
+import os
+import tty
+import time
+import json
+import select
+import argparse
+import threading
+import statistics
+import serial
+import protocol
+from serial_link import SerialLink
+
+ROUND_TRIPS = 500
+BURST = 2000
+# tempo entre a porta ser aberta e o READY, como o boot da placa; também
+# evita que o reset_input_buffer do pyserial ao abrir descarte o quadro
+BOOT_DELAY = 0.1
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+class FakeArduino:
+    """Responde como o firmware em arduino/main/main.ino, sobre um pty.
+
+    Com simulate_baud, cada quadro demora o tempo que levaria no fio
+    (10 bits por byte), para estimar o ganho da velocidade negociada.
+
+    Como a placa, só envia READY depois que alguém abre a porta: enquanto
+    nenhum processo tem o pty aberto, o master recebe POLLHUP.
+    """
+
+    def __init__(self, simulate_baud=False):
+        self.master, slave = os.openpty()
+        tty.setraw(self.master)
+        tty.setraw(slave)
+        self.port = os.ttyname(slave)
+        self._slave = slave
+        self.simulate_baud = simulate_baud
+        self.baudrate = protocol.INITIAL_BAUDRATE
+        self.mask = 0
+        self.frames = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def start(self):
+        # fecha a ponta do cliente para detectar quando ela for aberta
+        os.close(self._slave)
+        self._slave = None
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+        os.close(self.master)
+        if self._slave is not None:
+            os.close(self._slave)
+
+    def _send(self, frame_type, seq, payload):
+        os.write(self.master, protocol.encode(frame_type, seq, payload))
+
+    def _wire_delay(self):
+        if self.simulate_baud:
+            time.sleep(protocol.FRAME_SIZE * 10 / self.baudrate)
+
+    def _loop(self):
+        decoder = protocol.Decoder()
+        poller = select.poll()
+        poller.register(self.master, select.POLLIN)
+        connected = False
+        while not self._stop.is_set():
+            events = dict(poller.poll(100)).get(self.master, 0)
+            if events & select.POLLHUP:
+                # porta fechada do outro lado; o próximo open é um novo boot
+                connected = False
+                self._stop.wait(0.05)
+                continue
+            if not connected:
+                connected = True
+                decoder = protocol.Decoder()
+                self._stop.wait(BOOT_DELAY)
+                self._send(protocol.READY, 0, 0)
+                continue
+            if not events & select.POLLIN:
+                continue
+            try:
+                data = os.read(self.master, 4096)
+            except OSError:
+                return
+            for frame_type, seq, payload in decoder.feed(data):
+                self.frames += 1
+                self._wire_delay()
+                if frame_type == protocol.SET_PINS:
+                    self.mask = payload
+                    self._send(protocol.ACK, seq, payload)
+                elif frame_type == protocol.PING:
+                    self._send(protocol.ACK, seq, 0)
+                elif frame_type == protocol.BAUD:
+                    self._send(protocol.ACK, seq, payload)
+                    self.baudrate = payload
+                else:
+                    self._send(protocol.NACK, seq, 0)
+
+
+def read_ack(ser, decoder, seq, timeout=1.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        for frame_type, received_seq, payload in decoder.feed(
+            ser.read(ser.in_waiting or 1)
+        ):
+            if frame_type == protocol.ACK and received_seq == seq:
+                return payload
+    return None
+
+
+def measure_round_trip(port, baudrate, iterations):
+    latencies = []
+    with serial.Serial(port, baudrate, timeout=0.01) as ser:
+        ser.reset_input_buffer()
+        decoder = protocol.Decoder()
+        for i in range(iterations):
+            seq = i & 0xFF
+            mask = protocol.pins_to_mask([2 + i % 12])
+            start = time.perf_counter()
+            ser.write(protocol.encode(protocol.SET_PINS, seq, mask))
+            if read_ack(ser, decoder, seq) != mask:
+                raise RuntimeError(f"ACK ausente ou incorreto no quadro {i}.")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "iterations": iterations,
+        "mean_ms": statistics.fmean(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+    }
+
+
+def measure_throughput(port, baudrate, frames):
+    with serial.Serial(port, baudrate, timeout=0.01) as ser:
+        ser.reset_input_buffer()
+        decoder = protocol.Decoder()
+        start = time.perf_counter()
+        for i in range(frames):
+            ser.write(protocol.encode(protocol.SET_PINS, i & 0xFF, 1 << (2 + i % 12)))
+
+        acked = 0
+        deadline = time.perf_counter() + 10.0
+        while acked < frames and time.perf_counter() < deadline:
+            frames_in = decoder.feed(ser.read(ser.in_waiting or 1))
+            acked += sum(1 for frame in frames_in if frame[0] == protocol.ACK)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "frames": frames,
+        "acked": acked,
+        "frames_per_sec": acked / elapsed,
+        "bytes_per_sec": acked * protocol.FRAME_SIZE * 2 / elapsed,
+    }
+
+
+def measure_link(port, baudrate, updates):
+    link = SerialLink(port, baudrate=baudrate)
+    if not link.wait_ready(timeout=5.0):
+        raise RuntimeError("SerialLink não conectou ao Arduino simulado.")
+
+    start = time.perf_counter()
+    for i in range(updates):
+        link.send_pins([2 + i % 12])
+    enqueue_ms = (time.perf_counter() - start) * 1000
+    time.sleep(0.5)
+    link.close()
+
+    latencies = [latency * 1000 for latency in link.latencies]
+    return {
+        "updates": updates,
+        "enqueue_total_ms": enqueue_ms,
+        "sent": link.sent,
+        "acked": link.acked,
+        "coalesced": link.coalesced,
+        "ack_p50_ms": percentile(latencies, 50) if latencies else None,
+    }
+
+
+def main(simulate_baud=False, round_trips=ROUND_TRIPS, burst=BURST):
+    report = {}
+    for baudrate in (protocol.INITIAL_BAUDRATE, protocol.FAST_BAUDRATE):
+        device = FakeArduino(simulate_baud).start()
+        device.baudrate = baudrate
+        try:
+            report[baudrate] = {
+                "round_trip": measure_round_trip(device.port, baudrate, round_trips),
+                "throughput": measure_throughput(device.port, baudrate, burst),
+            }
+        finally:
+            device.stop()
+
+    device = FakeArduino(simulate_baud).start()
+    try:
+        report["serial_link"] = measure_link(device.port, protocol.FAST_BAUDRATE, burst)
+        report["serial_link"]["final_pins"] = protocol.mask_to_pins(device.mask)
+    finally:
+        device.stop()
+
+    print(json.dumps(report, indent=2))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mede latência e vazão do protocolo serial com um Arduino "
+        "simulado em um pseudo-terminal."
+    )
+    parser.add_argument(
+        "--simulate-baud",
+        action="store_true",
+        help="Atrasa cada quadro pelo tempo de transmissão real na velocidade.",
+    )
+    parser.add_argument("--round-trips", type=int, default=ROUND_TRIPS)
+    parser.add_argument("--burst", type=int, default=BURST)
+    args = parser.parse_args()
+
+    main(args.simulate_baud, args.round_trips, args.burst)
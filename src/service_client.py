@@ -0,0 +1,16 @@
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from shared import SERVICE_HOST, SERVICE_PORT
+
+
+class ServiceUnavailable(Exception):
+    pass
+
+
+def send_command(authkey, command, port=SERVICE_PORT, **fields):
+    try:
+        with Client((SERVICE_HOST, port), authkey=authkey) as conn:
+            conn.send({"cmd": command, **fields})
+            return conn.recv()
+    except (OSError, EOFError, AuthenticationError) as e:
+        raise ServiceUnavailable(str(e))
@@ -0,0 +1,132 @@
+import os
+import json
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from frames import resize_to_input
+from shared import IMG_SIZE, SHARDS_DIR
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+SHARD_SIZE = 2048
+
+
+def fingerprint(paths, y):
+    digest = hashlib.sha1(f"{INDEX_VERSION}:{IMG_SIZE}".encode())
+    for path, label in zip(paths, y):
+        stat = os.stat(path)
+        digest.update(f"{path}|{label}|{stat.st_mtime_ns}|{stat.st_size}\n".encode())
+    return digest.hexdigest()
+
+
+def read_index(shards_dir=SHARDS_DIR):
+    path = os.path.join(shards_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def load_resized(path):
+    img = cv2.imread(path)
+    if img is None:
+        raise ValueError(f"Não foi possível ler '{path}'.")
+    return resize_to_input(img)
+
+
+def write_shards(paths, y, labels, shard_size=SHARD_SIZE, shards_dir=SHARDS_DIR):
+    current = fingerprint(paths, y)
+    index = read_index(shards_dir)
+    if index and index.get("fingerprint") == current and index["labels"] == labels:
+        print("[INFO] Shards já estão atualizados.")
+        return index
+
+    print(f"[INFO] Gravando {len(paths)} imagens em shards binários...")
+    tmp_dir = shards_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    label_to_index = {name: i for i, name in enumerate(labels)}
+    shards = []
+    samples = []
+    with ThreadPoolExecutor() as executor:
+        for start in range(0, len(paths), shard_size):
+            chunk = paths[start : start + shard_size]
+            filename = f"shard_{len(shards):05d}.npy"
+            data = np.lib.format.open_memmap(
+                os.path.join(tmp_dir, filename),
+                mode="w+",
+                dtype=np.uint8,
+                shape=(len(chunk), IMG_SIZE, IMG_SIZE, 3),
+            )
+            for offset, img in enumerate(executor.map(load_resized, chunk)):
+                data[offset] = img
+            data.flush()
+            del data
+
+            for offset, path in enumerate(chunk):
+                label = y[start + offset]
+                samples.append([len(shards), offset, label_to_index[label], path])
+            shards.append({"file": filename, "count": len(chunk)})
+
+    index = {
+        "version": INDEX_VERSION,
+        "img_size": IMG_SIZE,
+        "fingerprint": current,
+        "labels": labels,
+        "shards": shards,
+        "samples": samples,
+    }
+    with open(os.path.join(tmp_dir, INDEX_FILE), "w") as f:
+        json.dump(index, f)
+
+    old_dir = shards_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(shards_dir):
+        os.replace(shards_dir, old_dir)
+    os.replace(tmp_dir, shards_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+    print(f"[INFO] {len(shards)} shards salvos em '{shards_dir}'")
+    return index
+
+
+class ShardedDataset:
+    def __init__(self, shards_dir=SHARDS_DIR):
+        index = read_index(shards_dir)
+        if index is None:
+            raise FileNotFoundError(f"Nenhum shard encontrado em '{shards_dir}'.")
+        if index["version"] != INDEX_VERSION or index["img_size"] != IMG_SIZE:
+            raise ValueError("Shards gerados com outra versão ou tamanho de imagem.")
+
+        self.labels = index["labels"]
+        self.shards = [
+            np.load(os.path.join(shards_dir, shard["file"]), mmap_mode="r")
+            for shard in index["shards"]
+        ]
+        samples = index["samples"]
+        self.shard_ids = np.array([s[0] for s in samples], dtype=np.int32)
+        self.offsets = np.array([s[1] for s in samples], dtype=np.int64)
+        self.label_indices = np.array([s[2] for s in samples], dtype=np.int32)
+        self.paths = [s[3] for s in samples]
+
+    def __len__(self):
+        return len(self.label_indices)
+
+    def image(self, i):
+        return self.shards[self.shard_ids[i]][self.offsets[i]]
+
+    def images(self, indices):
+        indices = np.asarray(indices)
+        batch = np.empty((len(indices), IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)
+        for shard_id in np.unique(self.shard_ids[indices]):
+            mask = self.shard_ids[indices] == shard_id
+            batch[mask] = self.shards[shard_id][self.offsets[indices[mask]]]
+        return batch
+
+    def sample(self, num_samples, seed=None):
+        rng = np.random.default_rng(seed)
+        size = min(num_samples, len(self))
+        return np.sort(rng.choice(len(self), size=size, replace=False))
@@ -4,3 +4,19 @@ MODELS_FOLDER = "models"
 IMG_SIZE = 224
 PROCESSED_DATA_DIR = "data/processed_data"
 CAPTURES_DIR = "data/captures"
+TFLITE_EXT = ".tflite"
+SHARDS_DIR = "data/shards"
+BACKBONES_DIR = "models/backbones"
+CHECKPOINTS_DIR = "models/checkpoints"
+SWEEPS_DIR = "models/sweeps"
+EMBEDDINGS_DIR = "data/embeddings"
+PROGRESS_PREFIX = "[PROGRESS]"
+SERVICE_HOST = "127.0.0.1"
+SERVICE_PORT = 6010
+SERVICE_AUTHKEY_ENV = "IARDUINO_SERVICE_KEY"
+BACKENDS = ("auto", "keras", "tflite")
+# modelos novos recebem pixels 0-255 e normalizam com uma camada Rescaling;
+# modelos antigos esperam a imagem já dividida por 255
+PIXEL_SCALE = 1.0 / 255
+INPUT_SCALE_RAW = 1.0
+INPUT_SCALE_LEGACY = PIXEL_SCALE
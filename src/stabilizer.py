@@ -0,0 +1,128 @@
+import time
+import numpy as np
+
+CONFIDENCE_THRESHOLD = 0.70
+RELEASE_THRESHOLD = 0.55
+BUFFER_SIZE = 10
+STABLE_FRAMES_REQUIRED = 5
+MIN_DWELL_SECONDS = 0.5
+EMA_ALPHA = 0.3
+MODES = ("window", "ema")
+
+
+class PredictionStabilizer:
+    """Suaviza as probabilidades e só troca de item em mudanças reais.
+
+    - window: média das últimas BUFFER_SIZE predições, mantida como soma
+      corrente sobre um buffer circular fixo (sem alocação por quadro);
+    - ema: média exponencial com fator EMA_ALPHA.
+
+    Um novo item só é aceito com confiança suavizada >= threshold por
+    stable_frames quadros seguidos, e depois de o item atual ficar ao menos
+    min_dwell segundos. O item atual é mantido enquanto sua confiança não cair
+    abaixo de release_threshold (histerese).
+    """
+
+    def __init__(
+        self,
+        mode="window",
+        buffer_size=BUFFER_SIZE,
+        threshold=CONFIDENCE_THRESHOLD,
+        release_threshold=RELEASE_THRESHOLD,
+        stable_frames=STABLE_FRAMES_REQUIRED,
+        min_dwell=MIN_DWELL_SECONDS,
+        alpha=EMA_ALPHA,
+    ):
+        if mode not in MODES:
+            raise ValueError(f"Modo de suavização desconhecido: {mode}")
+        if release_threshold > threshold:
+            raise ValueError("release_threshold deve ser <= threshold.")
+        self.mode = mode
+        self.buffer_size = buffer_size
+        self.threshold = threshold
+        self.release_threshold = release_threshold
+        self.stable_frames = stable_frames
+        self.min_dwell = min_dwell
+        self.alpha = alpha
+        self.labels = None
+        self.changes = 0
+        self.reset()
+
+    def reset(self, num_classes=0):
+        self._ring = np.zeros((self.buffer_size, num_classes), dtype=np.float32)
+        self._sum = np.zeros(num_classes, dtype=np.float64)
+        self._smoothed = np.zeros(num_classes, dtype=np.float32)
+        self._position = 0
+        self._count = 0
+        self.current = None
+        self.current_since = 0.0
+        self._candidate = None
+        self._candidate_frames = 0
+
+    @property
+    def current_label(self):
+        return None if self.current is None else self.labels[self.current]
+
+    def _smooth(self, prediction):
+        if self.mode == "ema":
+            if self._count == 0:
+                self._smoothed[:] = prediction
+            else:
+                self._smoothed *= 1.0 - self.alpha
+                self._smoothed += self.alpha * prediction
+            self._count += 1
+            return self._smoothed
+
+        slot = self._ring[self._position]
+        self._sum -= slot
+        slot[:] = prediction
+        self._sum += slot
+        self._position = (self._position + 1) % self.buffer_size
+        if self._position == 0:
+            # recalcula a soma uma vez por volta para não acumular erro
+            np.sum(self._ring, axis=0, out=self._sum)
+        self._count = min(self._count + 1, self.buffer_size)
+        np.divide(self._sum, self._count, out=self._smoothed, casting="unsafe")
+        return self._smoothed
+
+    def update(self, prediction, labels, now=None):
+        """Retorna (item estável ou None, probabilidades suavizadas)."""
+        now = time.monotonic() if now is None else now
+        if labels is not self.labels and labels != self.labels:
+            # modelo trocado: o histórico antigo não vale para as novas classes
+            self.labels = labels
+            self.reset(len(prediction))
+
+        smoothed = self._smooth(prediction)
+        top = int(smoothed.argmax())
+        confidence = smoothed[top]
+        dwell_done = now - self.current_since >= self.min_dwell
+
+        if self.current is not None:
+            holding = smoothed[self.current] >= self.release_threshold
+            if top == self.current or (holding and confidence < self.threshold):
+                self._candidate = None
+                return self.current_label, smoothed
+            if not holding and confidence < self.threshold and dwell_done:
+                self.current = None
+                self.current_since = now
+                self.changes += 1
+                return None, smoothed
+
+        if confidence < self.threshold:
+            self._candidate = None
+            return self.current_label, smoothed
+
+        if top == self._candidate:
+            self._candidate_frames += 1
+        else:
+            self._candidate = top
+            self._candidate_frames = 1
+
+        if self._candidate_frames >= self.stable_frames and dwell_done:
+            self.current = top
+            self.current_since = now
+            self._candidate = None
+            self.changes += 1
+
+        return self.current_label, smoothed
@@ -0,0 +1,425 @@
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import datetime
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from shared import IMG_SIZE, INPUT_SCALE_RAW, SWEEPS_DIR
+
+RESULTS_DB = os.path.join(SWEEPS_DIR, "results.sqlite")
+TRIALS = 27
+MIN_EPOCHS = 1
+MAX_EPOCHS = 9
+ETA = 3
+BATCH_SIZE = 16
+LATENCY_RUNS = 50
+SORT_KEYS = ("acc_per_ms", "val_accuracy")
+
+SEARCH_SPACE = {
+    "filters": [[16, 32], [32, 64], [32, 64, 128]],
+    "dense_units": [32, 64, 128],
+    "dropout": [0.2, 0.3, 0.4],
+    "dense_dropout": [0.3, 0.5],
+    "learning_rate": [1e-3, 5e-4, 2e-4],
+    "image_size": [96, 128, 160, IMG_SIZE],
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sweep TEXT NOT NULL,
+    trial INTEGER NOT NULL,
+    rung INTEGER NOT NULL,
+    epochs INTEGER NOT NULL,
+    config TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cached INTEGER NOT NULL DEFAULT 0,
+    val_accuracy REAL,
+    val_loss REAL,
+    latency_ms REAL,
+    params INTEGER,
+    model_bytes INTEGER,
+    wall_s REAL,
+    model_path TEXT,
+    error TEXT,
+    created TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS trials_lookup ON trials (config, epochs, dataset);
+CREATE VIEW IF NOT EXISTS trial_scores AS
+    SELECT *, val_accuracy / latency_ms AS acc_per_ms
+    FROM trials WHERE status = 'ok';
+"""
+
+
+class ResultStore:
+    """Resultados de todos os trials em SQLite, consultáveis fora deste script.
+
+    Um trial com a mesma configuração, épocas e dataset já medido (e cujo
+    modelo ainda existe) é reaproveitado em vez de treinado de novo.
+    """
+
+    def __init__(self, path=RESULTS_DB):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def record(self, sweep, trial, rung, epochs, config, dataset, result):
+        metrics = result.get("metrics", {})
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO trials (sweep, trial, rung, epochs, config, dataset, "
+                "status, cached, val_accuracy, val_loss, latency_ms, params, "
+                "model_bytes, wall_s, model_path, error, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    sweep,
+                    trial,
+                    rung,
+                    epochs,
+                    config_key(config),
+                    dataset,
+                    result["status"],
+                    int(result.get("cached", False)),
+                    metrics.get("val_accuracy"),
+                    metrics.get("val_loss"),
+                    metrics.get("latency_ms"),
+                    metrics.get("params"),
+                    metrics.get("model_bytes"),
+                    metrics.get("wall_s"),
+                    metrics.get("model_path"),
+                    result.get("error"),
+                    datetime.datetime.now().isoformat(timespec="seconds"),
+                ),
+            )
+
+    def cached(self, config, epochs, dataset):
+        rows = self.conn.execute(
+            "SELECT * FROM trials WHERE config = ? AND epochs = ? AND dataset = ? "
+            "AND status = 'ok' ORDER BY id DESC",
+            (config_key(config), epochs, dataset),
+        )
+        for row in rows:
+            if row["model_path"] and os.path.exists(row["model_path"]):
+                columns = ("val_accuracy", "val_loss", "latency_ms", "params")
+                columns += ("model_bytes", "wall_s", "model_path")
+                metrics = {column: row[column] for column in columns}
+                return {"status": "ok", "cached": True, "metrics": metrics}
+        return None
+
+    def latest_sweep(self):
+        row = self.conn.execute(
+            "SELECT sweep FROM trials ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        return row["sweep"] if row else None
+
+    def top(self, sweep=None, by="acc_per_ms", limit=10):
+        """Melhor resultado de cada trial (a maior rodada que ele alcançou)."""
+        if by not in SORT_KEYS:
+            raise ValueError(f"Ordenação desconhecida: {by}")
+        sweep = sweep or self.latest_sweep()
+        return self.conn.execute(
+            "SELECT * FROM trial_scores s WHERE sweep = ? AND epochs = ("
+            "SELECT MAX(epochs) FROM trial_scores t "
+            "WHERE t.sweep = s.sweep AND t.trial = s.trial"
+            f") ORDER BY {by} DESC LIMIT ?",
+            (sweep, limit),
+        ).fetchall()
+
+    def get(self, row_id):
+        return self.conn.execute(
+            "SELECT * FROM trials WHERE id = ?", (row_id,)
+        ).fetchone()
+
+
+def config_key(config):
+    return json.dumps(config, sort_keys=True)
+
+
+def sample_configs(count, seed=None, batch_size=BATCH_SIZE):
+    rng = random.Random(seed)
+    configs = []
+    seen = set()
+    # para quando o espaço de busca acaba antes de `count` combinações
+    for _ in range(count * 20):
+        config = {key: rng.choice(values) for key, values in SEARCH_SPACE.items()}
+        config["batch_size"] = batch_size
+        if config_key(config) not in seen:
+            seen.add(config_key(config))
+            configs.append(config)
+        if len(configs) == count:
+            break
+    return configs
+
+
+def init_worker(threads):
+    import tensorflow as tf
+
+    # cada processo do pool fica com uma fatia dos núcleos
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def measure_latency(model, runs=LATENCY_RUNS):
+    # latência de um quadro, como na detecção; medida com os outros trials
+    # rodando, então serve para comparar trials entre si
+    import numpy as np
+    import tensorflow as tf
+
+    forward = tf.function(lambda batch: model(batch, training=False))
+    frame = np.zeros((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+    for _ in range(3):
+        forward(frame)
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        forward(frame).numpy()
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2] * 1000
+
+
+def run_trial(config, epochs, initial_epoch, start_from, output):
+    """Treina um trial até `epochs`, continuando de start_from se houver."""
+    import numpy as np
+    import tensorflow as tf
+    from pre_process import build_dataset, split_dataset
+    from shards import ShardedDataset
+    from train_model import build_model
+
+    store = ShardedDataset()
+    num_classes = len(store.labels)
+    train_idx, val_idx, _ = split_dataset(np.arange(len(store)), store.label_indices)
+    batch_size = config["batch_size"]
+    train_ds = build_dataset(store, train_idx, num_classes, batch_size, training=True)
+    val_ds = build_dataset(store, val_idx, num_classes, batch_size)
+
+    if start_from:
+        model = tf.keras.models.load_model(start_from)
+    else:
+        model = build_model(
+            (IMG_SIZE, IMG_SIZE, 3),
+            num_classes,
+            optimizer=tf.keras.optimizers.Adam(config["learning_rate"]),
+            filters=config["filters"],
+            dense_units=config["dense_units"],
+            dropout=config["dropout"],
+            dense_dropout=config["dense_dropout"],
+            image_size=config["image_size"],
+        )
+
+    start = time.perf_counter()
+    history = model.fit(
+        train_ds,
+        epochs=epochs,
+        initial_epoch=initial_epoch,
+        validation_data=val_ds,
+        verbose=0,
+    )
+    wall = time.perf_counter() - start
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    model.save(output)
+    return {
+        "val_accuracy": float(history.history["val_accuracy"][-1]),
+        "val_loss": float(history.history["val_loss"][-1]),
+        "latency_ms": measure_latency(model),
+        "params": int(model.count_params()),
+        "model_bytes": os.path.getsize(output),
+        "wall_s": wall,
+        "model_path": output,
+    }
+
+
+def prepare_dataset():
+    # mesmo cache e shards do treino; sem TensorFlow no processo principal
+    from capture_cache import update_cache
+    from shards import write_shards
+
+    paths, y, labels = update_cache()
+    return write_shards(paths, y, labels)["fingerprint"]
+
+
+def run_sweep(
+    trials=TRIALS,
+    jobs=2,
+    min_epochs=MIN_EPOCHS,
+    max_epochs=MAX_EPOCHS,
+    eta=ETA,
+    seed=None,
+    batch_size=BATCH_SIZE,
+    db_path=RESULTS_DB,
+):
+    """Successive halving: todos os trials treinam min_epochs, só o melhor
+    1/eta segue para eta vezes mais épocas, até max_epochs.
+    """
+    dataset = prepare_dataset()
+    store = ResultStore(db_path)
+    sweep = datetime.datetime.now().strftime("sweep_%Y%m%d_%H%M%S")
+    configs = sample_configs(trials, seed, batch_size)
+    threads = max(1, (os.cpu_count() or 1) // jobs)
+    print(f"[INFO] {sweep}: {len(configs)} trials, {jobs} em paralelo")
+
+    # spawn: processos novos, sem herdar o estado do TensorFlow
+    pool = ProcessPoolExecutor(
+        max_workers=jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(threads,),
+    )
+    survivors = list(range(len(configs)))
+    trained = {}
+    rung, epochs = 0, min_epochs
+    with pool:
+        while True:
+            print(f"[INFO] Rodada {rung}: {len(survivors)} trials, {epochs} épocas")
+            results = {}
+            futures = {}
+            for trial in survivors:
+                cached = store.cached(configs[trial], epochs, dataset)
+                if cached:
+                    results[trial] = cached
+                    continue
+                done, start_from = trained.get(trial, (0, None))
+                # um arquivo por rodada: cada linha do SQLite aponta para o
+                # modelo com exatamente as épocas que ela registra
+                output = os.path.join(
+                    SWEEPS_DIR, sweep, f"trial_{trial:03d}_e{epochs}.keras"
+                )
+                future = pool.submit(
+                    run_trial, configs[trial], epochs, done, start_from, output
+                )
+                futures[future] = trial
+
+            for future in as_completed(futures):
+                trial = futures[future]
+                try:
+                    results[trial] = {"status": "ok", "metrics": future.result()}
+                except Exception as e:
+                    results[trial] = {"status": "error", "error": str(e)}
+
+            for trial in survivors:
+                result = results[trial]
+                store.record(
+                    sweep, trial, rung, epochs, configs[trial], dataset, result
+                )
+                if result["status"] != "ok":
+                    print(f"[AVISO] Trial {trial} falhou: {result['error']}")
+                    continue
+                metrics = result["metrics"]
+                trained[trial] = (epochs, metrics["model_path"])
+                print(
+                    f"[INFO] Trial {trial}: val_acc {metrics['val_accuracy']:.2%}, "
+                    f"{metrics['latency_ms']:.1f} ms"
+                    f"{' (cache)' if result.get('cached') else ''}"
+                )
+
+            ranked = sorted(
+                (t for t in survivors if results[t]["status"] == "ok"),
+                key=lambda t: results[t]["metrics"]["val_accuracy"],
+                reverse=True,
+            )
+            if epochs >= max_epochs or len(ranked) <= 1:
+                break
+            survivors = ranked[: max(1, len(ranked) // eta)]
+            rung, epochs = rung + 1, min(epochs * eta, max_epochs)
+
+    print_top(store, sweep)
+    return sweep
+
+
+def print_top(store, sweep=None, by="acc_per_ms", limit=10):
+    for row in store.top(sweep, by, limit):
+        print(
+            f"#{row['id']:<5} trial {row['trial']:<3} {row['epochs']:>2} ép. "
+            f"val_acc={row['val_accuracy']:.2%} {row['latency_ms']:.1f} ms "
+            f"acc/ms={row['acc_per_ms']:.4f} {row['params']} params "
+            f"{row['config']}"
+        )
+
+
+def publish_trial(store, row_id):
+    """Avalia o modelo de um trial no conjunto de teste e o publica."""
+    import numpy as np
+    import tensorflow as tf
+    from pre_process import build_dataset, split_dataset
+    from registry import publish
+    from shards import ShardedDataset, read_index
+    from train_model import save_model
+
+    row = store.get(row_id)
+    if row is None or row["status"] != "ok":
+        raise ValueError(f"Trial #{row_id} não encontrado ou sem resultado.")
+    # o conjunto de teste só é o mesmo do sweep se os shards não mudaram
+    index = read_index()
+    if index is None or index["fingerprint"] != row["dataset"]:
+        raise ValueError(
+            f"O dataset mudou desde o trial #{row_id}; rode o sweep de novo."
+        )
+
+    dataset = ShardedDataset()
+    labels = dataset.labels
+    _, _, test_idx = split_dataset(np.arange(len(dataset)), dataset.label_indices)
+    test_ds = build_dataset(dataset, test_idx, len(labels), BATCH_SIZE)
+
+    model = tf.keras.models.load_model(row["model_path"])
+    _, acc = model.evaluate(test_ds, verbose=0)
+    print(f"[RESULT] Acurácia no teste: {acc:.2%}")
+    model_filename = save_model(model, labels)
+    publish(
+        model_filename,
+        labels,
+        acc,
+        source="sweep",
+        input_scale=INPUT_SCALE_RAW,
+        sweep=row["sweep"],
+        trial=row["trial"],
+    )
+    return model_filename
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Busca de hiperparâmetros da CNN com successive halving."
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("--trials", type=int, default=TRIALS)
+    run_parser.add_argument("--jobs", type=int, default=2, help="Trials simultâneos.")
+    run_parser.add_argument("--min-epochs", type=int, default=MIN_EPOCHS)
+    run_parser.add_argument("--max-epochs", type=int, default=MAX_EPOCHS)
+    run_parser.add_argument("--eta", type=int, default=ETA)
+    run_parser.add_argument("--seed", type=int, default=None)
+    run_parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    top_parser = subparsers.add_parser("top")
+    top_parser.add_argument("--sweep", default=None, help="Padrão: o mais recente.")
+    top_parser.add_argument("--by", choices=SORT_KEYS, default="acc_per_ms")
+    top_parser.add_argument("--limit", type=int, default=10)
+    publish_parser = subparsers.add_parser("publish")
+    publish_parser.add_argument("id", type=int, help="Id do resultado (coluna #).")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "run":
+            if args.eta < 2 or args.min_epochs < 1:
+                raise ValueError("Use --eta >= 2 e --min-epochs >= 1.")
+            run_sweep(
+                args.trials,
+                args.jobs,
+                args.min_epochs,
+                args.max_epochs,
+                args.eta,
+                args.seed,
+                args.batch_size,
+            )
+        elif args.command == "top":
+            print_top(ResultStore(), args.sweep, args.by, args.limit)
+        else:
+            publish_trial(ResultStore(), args.id)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"[ERRO] {e}")
+        sys.exit(1)
@@ -1,84 +1,613 @@
+import argparse
 import datetime
+import math
+import os
+import sys
+import time
+import numpy as np
 import tensorflow as tf
 from tensorflow.keras import layers, models
-from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau, ModelCheckpoint
-from pre_process import preprocess
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+from pre_process import (
+    AUGMENTATIONS_PER_IMAGE,
+    build_dataset,
+    load_splits,
+    preprocess,
+    split_dataset,
+)
 import json
-from shared import MODEL_EXT, MODEL_PREFIX
+from checkpoints import (
+    TrainingCheckpoint,
+    checkpoint_dir,
+    finish,
+    load_checkpoint,
+    new_state,
+)
+from registry import publish, published_accuracy
+from shards import ShardedDataset
+from training_config import (
+    BATCH_CANDIDATES,
+    add_training_arguments,
+    apply_runtime,
+    config_from_args,
+    load_training_config,
+)
+from shared import (
+    IMG_SIZE,
+    INPUT_SCALE_RAW,
+    MODEL_EXT,
+    MODEL_PREFIX,
+    MODELS_FOLDER,
+    PIXEL_SCALE,
+    PROGRESS_PREFIX,
+)
 
+AUTOTUNE_STEPS = 10
 
-def build_model(input_shape, num_classes):
-    model = models.Sequential(
-        [
-            layers.Input(shape=input_shape),
-            layers.Conv2D(32, (3, 3), activation="relu"),
-            layers.BatchNormalization(),
-            layers.MaxPooling2D((2, 2)),
-            layers.Dropout(0.3),
-            layers.Conv2D(64, (3, 3), activation="relu"),
+
+class ProgressReporter(tf.keras.callbacks.Callback):
+    def __init__(self, batch_size, samples=None, report_every=10):
+        super().__init__()
+        self.batch_size = batch_size
+        # datasets com unbatch não têm tamanho conhecido e o Keras passa
+        # steps=None; com o total de amostras os passos saem daqui
+        self.samples = samples
+        self.report_every = report_every
+        self.epoch = 0
+        self.seen = 0
+        self.epoch_start = time.perf_counter()
+        self.train_end = self.epoch_start
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch = epoch + 1
+        self.seen = 0
+        self.epoch_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.seen += self.batch_size
+        if self.samples:
+            # o último lote da época costuma ser menor
+            self.seen = min(self.seen, self.samples)
+        self.train_end = time.perf_counter()
+        if (batch + 1) % self.report_every == 0:
+            self.emit(logs, step=batch + 1)
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.emit(logs, done=True)
+        # só o tempo dos passos de treino, sem a validação
+        elapsed = max(self.train_end - self.epoch_start, 1e-9)
+        print(f"[INFO] Época {self.epoch}: {self.seen / elapsed:.1f} imagens/s")
+
+    def steps(self):
+        if self.params.get("steps"):
+            return self.params["steps"]
+        if self.samples:
+            return math.ceil(self.samples / self.batch_size)
+        return None
+
+    def emit(self, logs, **fields):
+        elapsed = max(time.perf_counter() - self.epoch_start, 1e-9)
+        fields.update(
+            epoch=self.epoch,
+            epochs=self.params.get("epochs"),
+            steps=self.steps(),
+            samples_per_sec=round(self.seen / elapsed, 1),
+        )
+        for key, value in (logs or {}).items():
+            fields[key] = round(float(value), 4)
+        print(f"{PROGRESS_PREFIX} {json.dumps(fields)}", flush=True)
+
+
+def build_model(
+    input_shape,
+    num_classes,
+    optimizer="adam",
+    jit_compile="auto",
+    filters=(32, 64),
+    dense_units=64,
+    dropout=0.3,
+    dense_dropout=0.5,
+    image_size=None,
+):
+    stack = [layers.Input(shape=input_shape)]
+    if image_size and image_size != input_shape[0]:
+        # reduz a imagem dentro do modelo: a detecção continua entregando IMG_SIZE
+        stack.append(layers.Resizing(image_size, image_size))
+    stack.append(layers.Rescaling(PIXEL_SCALE))
+    for count in filters:
+        stack += [
+            layers.Conv2D(count, (3, 3), activation="relu"),
             layers.BatchNormalization(),
             layers.MaxPooling2D((2, 2)),
-            layers.Dropout(0.3),
-            layers.Flatten(),
-            layers.Dense(64, activation="relu"),
-            layers.Dropout(0.5),
-            layers.Dense(num_classes, activation="softmax"),
+            layers.Dropout(dropout),
         ]
-    )
+    stack += [
+        layers.Flatten(),
+        layers.Dense(dense_units, activation="relu"),
+        layers.Dropout(dense_dropout),
+        # softmax em float32 mesmo com precisão mista, por estabilidade
+        layers.Dense(num_classes, activation="softmax", dtype="float32"),
+    ]
+    model = models.Sequential(stack)
 
     model.compile(
+        optimizer=optimizer,
+        loss="categorical_crossentropy",
+        metrics=["accuracy"],
+        jit_compile=jit_compile,
+    )
+
+    return model
+
+
+def build_head(embedding_dim, num_classes):
+    head = models.Sequential(
+        [
+            layers.Input(shape=(embedding_dim,)),
+            layers.Dropout(0.2),
+            layers.Dense(num_classes, activation="softmax"),
+        ],
+        name="head",
+    )
+
+    head.compile(
         optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"]
     )
 
+    return head
+
+
+def combine(extractor, head):
+    inputs = layers.Input(shape=(IMG_SIZE, IMG_SIZE, 3))
+    model = models.Model(inputs, head(extractor(inputs)))
+    model.compile(
+        optimizer="adam", loss="categorical_crossentropy", metrics=["accuracy"]
+    )
     return model
 
 
-def main():
-    print("[INFO] Iniciando pré-processamento com todas as classes disponíveis...")
-    X_train, X_test, y_train, y_test, labels = preprocess()
+def compile_options(config):
+    optimizer = "adam"
+    if config["grad_accum_steps"] > 1:
+        optimizer = tf.keras.optimizers.Adam(
+            gradient_accumulation_steps=config["grad_accum_steps"]
+        )
+    return {"optimizer": optimizer, "jit_compile": True if config["xla"] else "auto"}
+
+
+class StepTimer(tf.keras.callbacks.Callback):
+    """Mede os passos depois do primeiro (compilação e buffer de shuffle)."""
+
+    def __init__(self):
+        super().__init__()
+        self.start = None
+        self.end = None
+        self.steps = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.end = time.perf_counter()
+        if batch == 0:
+            self.start = self.end
+        else:
+            self.steps += 1
+
+
+def autotune_batch_size(store, train_idx, config, steps=AUTOTUNE_STEPS):
+    """Treina alguns passos com cada tamanho de lote e fica com o mais rápido.
+
+    Para ao primeiro tamanho que não cabe na memória ou não melhora a vazão.
+    """
+    num_classes = len(store.labels)
+    max_batch = min(config["max_batch_size"], len(train_idx) * AUGMENTATIONS_PER_IMAGE)
+    candidates = [b for b in BATCH_CANDIDATES if b <= max_batch] or [max_batch]
+
+    best_batch, best_rate = config["batch_size"], 0.0
+    for batch_size in candidates:
+        # repeat: lotes grandes não podem esgotar os dados antes dos passos
+        ds = build_dataset(store, train_idx, num_classes, batch_size, training=True)
+        model = build_model(
+            (IMG_SIZE, IMG_SIZE, 3), num_classes, **compile_options(config)
+        )
+        timer = StepTimer()
+        try:
+            # um único fit; o primeiro passo compila o grafo e enche o buffer
+            # de shuffle, e não entra na medição
+            model.fit(
+                ds.repeat(),
+                epochs=1,
+                steps_per_epoch=steps + 1,
+                callbacks=[timer],
+                verbose=0,
+            )
+        except (tf.errors.ResourceExhaustedError, MemoryError):
+            print(f"[INFO] Lote {batch_size}: sem memória.")
+            break
+        rate = batch_size * timer.steps / max(timer.end - timer.start, 1e-9)
+        print(f"[INFO] Lote {batch_size}: {rate:.1f} imagens/s")
+        if rate <= best_rate:
+            break
+        best_batch, best_rate = batch_size, rate
+
+    print(f"[INFO] Tamanho de lote escolhido: {best_batch}")
+    return best_batch
+
+
+def to_float32(model, num_classes):
+    # o modelo publicado roda em float32 na inferência e na exportação TFLite
+    policy = tf.keras.mixed_precision.global_policy()
+    tf.keras.mixed_precision.set_global_policy("float32")
+    try:
+        exported = build_model((IMG_SIZE, IMG_SIZE, 3), num_classes)
+    finally:
+        tf.keras.mixed_precision.set_global_policy(policy)
+    exported.set_weights(model.get_weights())
+    return exported
+
+
+def lr_schedule():
+    return ReduceLROnPlateau(
+        monitor="val_loss", factor=0.5, patience=3, min_lr=1e-6, verbose=1
+    )
+
+
+def best_so_far_publisher(labels):
+    def publish_best(model, epoch, val_accuracy):
+        # parcial: sem acurácia de teste, para não competir com modelos finais
+        model_filename = save_model(to_float32(model, len(labels)), labels)
+        publish(
+            model_filename,
+            labels,
+            source="cnn",
+            input_scale=INPUT_SCALE_RAW,
+            partial=True,
+            epoch=epoch,
+            val_accuracy=round(val_accuracy, 4),
+        )
+        return model_filename
+
+    return publish_best
+
+
+def train_from_scratch(config, precision="float32", resume=False):
+    store, splits = load_splits()
+    directory = checkpoint_dir()
+    resumed = load_checkpoint(directory) if resume else None
+    if resume and resumed is None:
+        print("[AVISO] Nenhum checkpoint encontrado; começando do zero.")
+
+    if resumed is not None:
+        model, state = resumed
+        if state["labels"] != store.labels:
+            raise ValueError(
+                "As classes mudaram desde o checkpoint; treine sem --resume."
+            )
+        batch_size = state["batch_size"]
+        print(f"[INFO] Retomando do checkpoint da época {state['epoch']}.")
+    else:
+        batch_size = config["batch_size"]
+        if config["autotune_batch"]:
+            print("[INFO] Ajustando o tamanho do lote...")
+            batch_size = autotune_batch_size(store, splits[0], config)
+        # parciais só são publicados se superarem o modelo final atual
+        state = new_state(
+            store.labels, batch_size, best=published_accuracy(store.labels)
+        )
+
+    train_ds, val_ds, test_ds, labels, counts = preprocess(
+        batch_size, loaded=(store, splits)
+    )
 
     print(f"[INFO] Labels encontradas: {labels}")
-    print(f"[INFO] Total de amostras de treino: {len(X_train)}")
-    print(f"[INFO] Total de amostras de teste: {len(X_test)}")
+    print(f"[INFO] Total de amostras de treino: {counts['train']}")
+    print(f"[INFO] Total de amostras de validação: {counts['val']}")
+    print(f"[INFO] Total de amostras de teste: {counts['test']}")
+    if config["grad_accum_steps"] > 1:
+        effective = batch_size * config["grad_accum_steps"]
+        print(f"[INFO] Lote efetivo com acumulação de gradientes: {effective}")
 
-    print("[INFO] Construindo modelo...")
-    model = build_model(X_train.shape[1:], len(labels))
+    if resumed is None:
+        print("[INFO] Construindo modelo...")
+        model = build_model(
+            (IMG_SIZE, IMG_SIZE, 3), len(labels), **compile_options(config)
+        )
     model.summary()
 
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    checkpoint_path = f"models/{MODEL_PREFIX}{timestamp}{MODEL_EXT}"
-
     callbacks = [
         EarlyStopping(
             monitor="val_loss", patience=8, restore_best_weights=True, verbose=1
-        )
+        ),
+        lr_schedule(),
+        TrainingCheckpoint(
+            directory,
+            state,
+            best_so_far_publisher(labels),
+            every=config["checkpoint_every"],
+        ),
+        ProgressReporter(batch_size=batch_size, samples=counts["train"]),
     ]
 
     print("[INFO] Iniciando treino...")
 
     history = model.fit(
+        train_ds,
+        epochs=config["epochs"],
+        initial_epoch=state["epoch"],
+        validation_data=val_ds,
+        callbacks=callbacks,
+        verbose=2,
+    )
+
+    if precision != "float32":
+        model = to_float32(model, len(labels))
+
+    print("\n[INFO] Avaliando modelo no conjunto de teste...")
+    loss, acc = model.evaluate(test_ds, verbose=0)
+    return model, labels, acc, test_ds
+
+
+def train_distributed(config, precision="float32"):
+    """Treina a CNN com MultiWorkerMirroredStrategy a partir do TF_CONFIG.
+
+    Só o chefe avalia e devolve o modelo; os demais workers retornam None.
+    """
+    from distributed import backup_dir, create_strategy, is_chief, sharded_dataset
+
+    strategy = create_strategy()
+    chief = is_chief()
+    # os shards já foram gerados pelo lançador (ou por pre_process.py)
+    store = ShardedDataset()
+    labels = store.labels
+    train_idx, val_idx, test_idx = split_dataset(
+        np.arange(len(store)), store.label_indices
+    )
+
+    batch_size = config["batch_size"]
+    if config["autotune_batch"]:
+        print("[AVISO] --autotune-batch é ignorado no modo distribuído.")
+    train_ds, train_steps = sharded_dataset(
+        strategy, store, train_idx, batch_size, training=True
+    )
+    val_ds, val_steps = sharded_dataset(strategy, store, val_idx, batch_size)
+    global_batch = batch_size * strategy.num_replicas_in_sync
+    print(
+        f"[INFO] {strategy.num_replicas_in_sync} réplicas, lote global "
+        f"{global_batch}, {train_steps} passos por época"
+    )
+
+    with strategy.scope():
+        model = build_model(
+            (IMG_SIZE, IMG_SIZE, 3), len(labels), **compile_options(config)
+        )
+
+    callbacks = [
+        # um job interrompido retoma da última época concluída
+        tf.keras.callbacks.BackupAndRestore(backup_dir()),
+        EarlyStopping(
+            monitor="val_loss",
+            patience=8,
+            restore_best_weights=True,
+            verbose=int(chief),
+        ),
+        lr_schedule(),
+    ]
+    if chief:
+        callbacks.append(ProgressReporter(batch_size=global_batch))
+
+    print("[INFO] Iniciando treino distribuído...")
+    model.fit(
+        train_ds,
+        epochs=config["epochs"],
+        steps_per_epoch=train_steps,
+        validation_data=val_ds,
+        validation_steps=val_steps,
+        callbacks=callbacks,
+        verbose=2 if chief else 0,
+    )
+
+    # copia os pesos para um modelo comum, fora do escopo da estratégia
+    model = to_float32(model, len(labels))
+    if not chief:
+        return None
+
+    print("\n[INFO] Avaliando modelo no conjunto de teste...")
+    test_ds = build_dataset(store, test_idx, len(labels), batch_size)
+    loss, acc = model.evaluate(test_ds, verbose=0)
+    return model, labels, acc, test_ds
+
+
+def train_with_backbone(backbone, backbone_weights=None):
+    from embeddings import (
+        build_feature_extractor,
+        compute_embeddings,
+        feature_cache_name,
+    )
+
+    store, (train_idx, val_idx, test_idx) = load_splits()
+    labels = store.labels
+    num_classes = len(labels)
+
+    print(f"[INFO] Labels encontradas: {labels}")
+    print(f"[INFO] Carregando backbone pré-treinado '{backbone}'...")
+    extractor = build_feature_extractor(backbone, backbone_weights)
+    embeddings = compute_embeddings(store, extractor, feature_cache_name(extractor))
+    dim = embeddings.shape[-1]
+
+    def one_hot(indices):
+        return tf.keras.utils.to_categorical(indices, num_classes)
+
+    X_train = embeddings[train_idx].reshape(-1, dim)
+    y_train = one_hot(
+        np.repeat(store.label_indices[train_idx], AUGMENTATIONS_PER_IMAGE)
+    )
+    X_val, y_val = embeddings[val_idx, 0], one_hot(store.label_indices[val_idx])
+    X_test, y_test = embeddings[test_idx, 0], one_hot(store.label_indices[test_idx])
+
+    print(f"[INFO] Total de amostras de treino: {len(X_train)}")
+    print(f"[INFO] Total de amostras de validação: {len(X_val)}")
+    print(f"[INFO] Total de amostras de teste: {len(X_test)}")
+
+    print("[INFO] Treinando apenas a camada de classificação...")
+    head = build_head(dim, num_classes)
+    head.fit(
         X_train,
         y_train,
-        epochs=25,
-        batch_size=16,
-        validation_split=0.1,
-        callbacks=callbacks,
-        verbose=1,
+        epochs=50,
+        batch_size=64,
+        validation_data=(X_val, y_val),
+        callbacks=[
+            EarlyStopping(
+                monitor="val_loss", patience=5, restore_best_weights=True, verbose=1
+            ),
+            ProgressReporter(batch_size=64, samples=len(X_train)),
+        ],
+        verbose=2,
     )
 
     print("\n[INFO] Avaliando modelo no conjunto de teste...")
-    loss, acc = model.evaluate(X_test, y_test, verbose=0)
-    print(f"[RESULT] Acurácia no teste: {acc:.2%}")
+    loss, acc = head.evaluate(X_test, y_test, verbose=0)
+    test_ds = build_dataset(store, test_idx, num_classes, batch_size=64)
+    return combine(extractor, head), labels, acc, test_ds
+
+
+def save_model(model, labels):
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    model_filename = f"{MODEL_PREFIX}{timestamp}{MODEL_EXT}"
+    checkpoint_path = os.path.join(MODELS_FOLDER, model_filename)
 
     model.save(checkpoint_path)
+    print(f"[INFO] Modelo salvo em: {checkpoint_path}")
 
-    label_file = f"models/{MODEL_PREFIX}{timestamp}.labels.json"
+    label_file = os.path.join(
+        MODELS_FOLDER, f"{MODEL_PREFIX}{timestamp}.labels.json"
+    )
     with open(label_file, "w") as f:
         json.dump(labels, f)
 
     print(f"[INFO] Labels salvos em: {label_file}")
+    return model_filename
+
+
+def main(
+    tflite_quantizations=(),
+    backbone=None,
+    backbone_weights=None,
+    config=None,
+    distributed=False,
+    resume=False,
+):
+    config = config or load_training_config()
+    if backbone:
+        # só a cabeça treina, sobre embeddings em cache: bf16 não compensa
+        config = dict(config, precision="float32")
+    precision = apply_runtime(config)
+
+    print("[INFO] Iniciando pré-processamento com todas as classes disponíveis...")
+    if distributed:
+        result = train_distributed(config, precision)
+        if result is None:
+            print("[INFO] Worker concluído; o chefe salva e publica o modelo.")
+            return
+        model, labels, acc, test_ds = result
+    elif backbone:
+        model, labels, acc, test_ds = train_with_backbone(backbone, backbone_weights)
+    else:
+        model, labels, acc, test_ds = train_from_scratch(config, precision, resume)
+
+    print(f"[RESULT] Acurácia no teste: {acc:.2%}")
+
+    model_filename = save_model(model, labels)
+
+    if tflite_quantizations:
+        from export_tflite import export_tflite
+
+        export_tflite(
+            model,
+            model_filename,
+            tflite_quantizations,
+            test_ds,
+            keras_acc=acc,
+        )
+
+    # só depois de todos os arquivos gravados o modelo fica visível
+    publish(
+        model_filename,
+        labels,
+        acc,
+        source=backbone or "cnn",
+        input_scale=INPUT_SCALE_RAW,
+    )
+    if not (distributed or backbone):
+        finish(checkpoint_dir(), model_filename)
+
     print("[INFO] Concluído!")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--tflite",
+        choices=["fp16", "int8", "all"],
+        action="append",
+        default=[],
+        help="Exporta também um modelo TFLite quantizado (pode repetir).",
+    )
+    parser.add_argument(
+        "--backbone",
+        choices=["mobilenet_v3_small", "mobilenet_v3_large"],
+        default=None,
+        help="Usa um backbone pré-treinado congelado e treina só a classificação.",
+    )
+    parser.add_argument(
+        "--backbone-weights",
+        default=None,
+        help="Arquivo local de pesos do backbone (padrão: models/backbones/).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Treino distribuído com N processos locais (para testes).",
+    )
+    parser.add_argument(
+        "--distributed",
+        action="store_true",
+        help="Treino distribuído conforme a variável TF_CONFIG deste worker.",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continua do último checkpoint em models/checkpoints/.",
+    )
+    add_training_arguments(parser)
+    args = parser.parse_args()
+
+    try:
+        config = config_from_args(args)
+    except (OSError, ValueError) as e:
+        print(f"[ERRO] Configuração de treino inválida: {e}")
+        sys.exit(1)
+
+    if (args.workers or args.distributed) and args.backbone:
+        print("[ERRO] O modo distribuído treina só a CNN, sem --backbone.")
+        sys.exit(1)
+
+    if args.workers:
+        from distributed import launch_local_workers, without_option
+
+        sys.exit(
+            launch_local_workers(
+                args.workers,
+                without_option(sys.argv, "--workers"),
+                config["intra_op_threads"],
+            )
+        )
+
+    quantizations = ["fp16", "int8"] if "all" in args.tflite else args.tflite
+    main(
+        tuple(dict.fromkeys(quantizations)),
+        args.backbone,
+        args.backbone_weights,
+        config,
+        args.distributed,
+        args.resume,
+    )
@@ -0,0 +1,135 @@
+import os
+import json
+
+PRECISIONS = ("float32", "bfloat16", "auto")
+BATCH_CANDIDATES = (16, 32, 64, 128, 256, 512)
+
+# valores usados quando nem o arquivo nem a linha de comando definem a opção
+DEFAULTS = {
+    "epochs": 25,
+    "batch_size": 16,
+    "autotune_batch": False,
+    "max_batch_size": 256,
+    "grad_accum_steps": 1,
+    "intra_op_threads": None,
+    "inter_op_threads": None,
+    "xla": False,
+    "precision": "float32",
+    "checkpoint_every": 1,
+}
+
+
+def load_training_config(path=None, overrides=None):
+    """Junta DEFAULTS, o arquivo JSON (opcional) e as opções da linha de comando.
+
+    Opções None em overrides não sobrescrevem o arquivo.
+    """
+    config = dict(DEFAULTS)
+    if path:
+        with open(path, "r") as f:
+            config.update(json.load(f))
+    config.update({k: v for k, v in (overrides or {}).items() if v is not None})
+
+    unknown = sorted(set(config) - set(DEFAULTS))
+    if unknown:
+        raise ValueError(f"Opções de treino desconhecidas: {', '.join(unknown)}")
+    if config["precision"] not in PRECISIONS:
+        raise ValueError(f"Precisão desconhecida: {config['precision']}")
+    if config["grad_accum_steps"] < 1:
+        raise ValueError("grad_accum_steps deve ser pelo menos 1.")
+    if config["checkpoint_every"] < 1:
+        raise ValueError("checkpoint_every deve ser pelo menos 1.")
+    return config
+
+
+def bf16_supported():
+    # sem instruções bf16 o TensorFlow emula o tipo e o treino fica mais lento
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def apply_runtime(config):
+    """Configura threads, XLA e precisão; chamar antes de criar qualquer tensor.
+
+    Retorna a precisão efetivamente usada.
+    """
+    import tensorflow as tf
+
+    if config["intra_op_threads"] is not None:
+        tf.config.threading.set_intra_op_parallelism_threads(
+            config["intra_op_threads"]
+        )
+    if config["inter_op_threads"] is not None:
+        tf.config.threading.set_inter_op_parallelism_threads(
+            config["inter_op_threads"]
+        )
+
+    precision = config["precision"]
+    if precision != "float32" and not bf16_supported():
+        if precision == "bfloat16":
+            print("[AVISO] CPU sem suporte a bfloat16; treinando em float32.")
+        precision = "float32"
+    policy = "mixed_bfloat16" if precision == "bfloat16" else "float32"
+    tf.keras.mixed_precision.set_global_policy(policy)
+
+    print(
+        f"[INFO] Treino: {os.cpu_count()} CPUs, "
+        f"intra-op {config['intra_op_threads'] or 'auto'}, "
+        f"inter-op {config['inter_op_threads'] or 'auto'}, "
+        f"XLA {'ligado' if config['xla'] else 'desligado'}, {precision}"
+    )
+    return precision
+
+
+def add_training_arguments(parser):
+    group = parser.add_argument_group("configuração do treino")
+    group.add_argument(
+        "--config",
+        default=None,
+        help="Arquivo JSON com as opções abaixo (a linha de comando prevalece).",
+    )
+    group.add_argument("--epochs", type=int, default=None)
+    group.add_argument("--batch-size", type=int, default=None)
+    group.add_argument(
+        "--autotune-batch",
+        action="store_true",
+        default=None,
+        help="Mede alguns passos com lotes maiores e usa o de mais imagens/s.",
+    )
+    group.add_argument("--max-batch-size", type=int, default=None)
+    group.add_argument(
+        "--grad-accum-steps",
+        type=int,
+        default=None,
+        help="Acumula gradientes de N lotes antes de atualizar os pesos.",
+    )
+    group.add_argument("--intra-op-threads", type=int, default=None)
+    group.add_argument("--inter-op-threads", type=int, default=None)
+    group.add_argument(
+        "--xla",
+        action="store_true",
+        default=None,
+        help="Compila o passo de treino com XLA.",
+    )
+    group.add_argument(
+        "--precision",
+        choices=PRECISIONS,
+        default=None,
+        help="bfloat16 misto só é usado se a CPU suportar (auto: se suportar).",
+    )
+    group.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=None,
+        help="Salva pesos e otimizador a cada N épocas.",
+    )
+
+
+def config_from_args(args):
+    return load_training_config(
+        args.config, {key: getattr(args, key, None) for key in DEFAULTS}
+    )